@@ -1,10 +1,11 @@
 import dash
 from dash import Dash
 import dash_bootstrap_components as dbc
-from core.loaders.gsheet_loader import GoogleSheetsLoader
 
+from config import Config
+from core import metrics
 from viz.layout import build_layout
-from viz.callbacks import register_callbacks
+from viz.callbacks import register_callbacks, warm_up
 
 
 # Создаём Dash-приложение
@@ -21,6 +22,14 @@ app.layout = build_layout()
 # Регистрируем callbacks
 register_callbacks(app)
 
+# Метрики Prometheus на /metrics (Config.METRICS_ENABLED)
+metrics.install(app)
+
+# Лоадер и тяжёлые импорты по умолчанию откладываются до первого запроса;
+# с gunicorn --preload их выгоднее сделать один раз в мастер-процессе
+if Config.EAGER_STARTUP:
+    warm_up()
+
 # WSGI-сервер (для gunicorn/uwsgi и т.п.)
 server = app.server
 
@@ -0,0 +1,84 @@
+"""
+Бенчмарк загрузки Excel: время и пиковый RSS по движкам ExcelLoader.
+
+Генерирует книгу из нескольких листов «Отчет …» и для каждого движка
+в отдельном процессе читает один лист (холодно, затем из кэша).
+
+    python -m bench.bench_excel [--metrics 1000] [--days 31] [--sheets 12]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.synthetic import write_workbook
+
+ENGINES = ["pandas", "stream", "calamine"]
+
+
+def run_one(path, engine, sheet):
+    """Замер в текущем процессе; печатает JSON для родителя."""
+    from core.loaders.excel_loader import ExcelLoader
+
+    loader = ExcelLoader(path, engine=engine)
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = loader.load(sheet)
+    cold = time.perf_counter() - start
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    loader.load(sheet)
+    warm = time.perf_counter() - start
+
+    # ru_maxrss: КБ в Linux
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "engine": engine, "shape": list(df.shape),
+        "cold_s": cold, "warm_s": warm,
+        "peak_rss_mb": peak_kb / 1024, "py_peak_mb": py_peak / 2 ** 20,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--metrics", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--sheets", type=int, default=12)
+    parser.add_argument("--_run", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._run:
+        run_one(*args._run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        write_workbook(path, args.metrics, args.days, args.sheets)
+        sheet = f"Отчет {args.sheets}"
+        print(f"Книга {args.sheets} листов × {args.metrics}×{args.days}, "
+              f"{os.path.getsize(path) / 1e6:.1f} МБ, читаем '{sheet}'")
+        print(f"{'движок':>9} {'холодно, с':>11} {'из кэша, мс':>12} "
+              f"{'пик RSS, МБ':>12} {'пик Python, МБ':>15}")
+
+        for engine in ENGINES:
+            proc = subprocess.run(
+                [sys.executable, "-m", "bench.bench_excel", "--_run", path, engine, sheet],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{engine:>9} недоступен: {proc.stderr.strip().splitlines()[-1]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{engine:>9} {r['cold_s']:>11.2f} {r['warm_s'] * 1000:>12.2f} "
+                  f"{r['peak_rss_mb']:>12.0f} {r['py_peak_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Микробенчмарк перетаскивания слайдера day-range.
+
+Сравнивает исходный путь DataProcessor.process_data (pd.to_datetime по всем
+колонкам + pd.to_numeric на каждый вызов) с накопленными суммами MetricMatrix
+на листах от месяца до года дней.
+
+    python -m bench.bench_slider
+"""
+import random
+import time
+
+import pandas as pd
+
+from bench.synthetic import sheet_frame
+from core.processor import DataProcessor
+
+METRICS = 500
+DAY_COUNTS = [31, 92, 183, 366]
+REPEATS = 50
+
+
+def _legacy_normalize(col):
+    dt = pd.to_datetime(col, errors="coerce")
+    return dt.strftime("%Y-%m-%d") if pd.notna(dt) else str(col)
+
+
+def legacy_process_data(processor, day_range):
+    """Исходная реализация process_data — для сравнения."""
+    start_day, end_day = day_range
+    day_cols = processor.data_columns[start_day - 1:end_day]
+    normalized_day_cols = [_legacy_normalize(col) for col in day_cols]
+    col_mapping = {_legacy_normalize(col): col for col in processor.df.columns[2:]}
+    selected_cols = [col_mapping[col] for col in normalized_day_cols if col in col_mapping]
+    data_period = processor.df[["Показатель"] + selected_cols].copy()
+    num_data = data_period[selected_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    agg = data_period[["Показатель"]].copy()
+    agg["Сумма за период"] = num_data.sum(axis=1)
+    return data_period, agg
+
+
+def time_ranges(fn, n_days, repeats):
+    rnd = random.Random(1)
+    ranges = []
+    for _ in range(repeats):
+        a = rnd.randint(1, n_days)
+        b = rnd.randint(a, n_days)
+        ranges.append([a, b])
+    start = time.perf_counter()
+    for day_range in ranges:
+        fn(day_range)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    print(f"{'дней':>6} {'legacy, мс':>12} {'prefix, мс':>12} {'range_sum, мкс':>15}")
+    for n_days in DAY_COUNTS:
+        processor = DataProcessor()
+        processor.load_from_gsheet(sheet_frame(METRICS, n_days), f"bench {n_days}")
+
+        legacy_ms = time_ranges(lambda r: legacy_process_data(processor, r), n_days, 5)
+        prefix_ms = time_ranges(
+            lambda r: processor.process_data(r, include_raw=False), n_days, REPEATS
+        )
+        raw_us = time_ranges(
+            lambda r: processor.matrix.range_sum(r[0] - 1, r[1]), n_days, REPEATS
+        ) * 1000
+
+        print(f"{n_days:>6} {legacy_ms:>12.2f} {prefix_ms:>12.2f} {raw_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
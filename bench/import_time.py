@@ -0,0 +1,82 @@
+"""
+Бюджет времени импорта приложения (старт воркера gunicorn).
+
+Запускает `python -X importtime -c "import app"` в чистом процессе,
+печатает самые медленные модули (по собственному и накопленному времени)
+и завершается с кодом 1, если общее время больше бюджета.
+
+    python -m bench.import_time [--budget-ms 2000] [--top 15] [--module app] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Замер на этом дереве: import app — 1.7–1.9 с, из них dash ~0.9 с и pandas ~0.4 с
+# (его тянут реестр кадров и кэши, создаваемые при импорте коллбеков).
+# Бюджет — замер с запасом на шум: рост сверх него — новый тяжёлый импорт
+DEFAULT_BUDGET_MS = 2000
+
+
+def import_profile(module):
+    """[(модуль, собственное мкс, накопленное мкс, глубина)] в порядке вывода importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} упал:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="результат в JSON")
+    args = parser.parse_args()
+
+    rows = import_profile(args.module)
+    total_ms = next(cum for name, _, cum, _ in rows if name == args.module) / 1000
+    # Модули верхнего уровня, которые импортирует приложение напрямую
+    direct = sorted((r for r in rows if r[3] == 1), key=lambda r: r[2], reverse=True)
+    slowest_self = sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+    over_budget = total_ms > args.budget_ms
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": total_ms,
+            "budget_ms": args.budget_ms,
+            "over_budget": over_budget,
+            "direct_imports": [{"module": n, "cumulative_ms": c / 1000} for n, _, c, _ in direct[: args.top]],
+            "slowest_self": [{"module": n, "self_ms": s / 1000} for n, s, _, _ in slowest_self],
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"import {args.module}: {total_ms:.0f} мс (бюджет {args.budget_ms:.0f} мс)")
+        print(f"\n{'прямые импорты':<45} {'накопл., мс':>12}")
+        for name, _, cumulative, _ in direct[: args.top]:
+            print(f"{name:<45} {cumulative / 1000:>12.1f}")
+        print(f"\n{'самые медленные модули':<45} {'собств., мс':>12}")
+        for name, self_us, _, _ in slowest_self:
+            print(f"{name:<45} {self_us / 1000:>12.1f}")
+        if over_budget:
+            print(f"\nПревышен бюджет: {total_ms:.0f} > {args.budget_ms:.0f} мс")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""
+Набор бенчмарков на синтетических листах (bench/synthetic.py).
+
+Замеряет загрузку листа GoogleSheetsLoader (фейковый клиент), ExcelLoader
+и папки CSV-выгрузок через core.sources (по очереди и конкурентно),
+DataProcessor.process_data, обновление версии листа (частичный разбор и итоги
+по периодам), построители графиков и Dash-коллбеки целиком
+(через тестовый клиент Flask, с сериализацией ответа). Для каждого случая —
+медиана и минимум времени, пик памяти Python (tracemalloc, отдельный прогон)
+и размер полезной нагрузки (JSON фигуры / ответа коллбека).
+
+Результат — JSON для сравнения прогонов:
+
+    python -m bench.run --out before.json
+    python -m bench.run --out after.json --compare before.json
+    python -m bench.run --sizes 50x31 200x92 --cases process_data charts
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from bench import synthetic
+from config import Config
+
+SHEET_ID = "bench"
+# Многолистовая загрузка — пока суммарный объём не больше этого числа ячеек
+MANY_SHEETS = 12
+MANY_SHEETS_MAX_CELLS = 12 * 200 * 92
+
+
+def measure(fn, repeats, setup=None):
+    """
+    fn(setup()) repeats раз: медиана/минимум в мс, затем ещё один прогон
+    под tracemalloc ради пика памяти. Возвращает (замеры, результат последнего вызова).
+    """
+    times = []
+    result = None
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = fn(arg)
+        times.append((time.perf_counter() - start) * 1000)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "repeats": repeats,
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+        "peak_mb": peak / 2 ** 20,
+    }, result
+
+
+# --- случаи -----------------------------------------------------------------
+
+def case_gsheet_load(n_metrics, n_days, repeats):
+    from core.loaders.gsheet_loader import GoogleSheetsLoader
+
+    book = synthetic.report_book(1, n_metrics, n_days, two_row_header=True)
+    loader = GoogleSheetsLoader("", [], client=synthetic.FakeClient({SHEET_ID: book}))
+    stats, df = measure(lambda _: loader.load(SHEET_ID, "Отчет 1"), repeats, setup=loader.clear_cache)
+    stats["shape"] = list(df.shape)
+    return stats
+
+
+def case_gsheet_load_many(n_metrics, n_days, repeats):
+    if MANY_SHEETS * n_metrics * n_days > MANY_SHEETS_MAX_CELLS:
+        return None
+    from core.loaders.gsheet_loader import GoogleSheetsLoader
+
+    book = synthetic.report_book(MANY_SHEETS, n_metrics, n_days, two_row_header=True)
+    loader = GoogleSheetsLoader("", [], client=synthetic.FakeClient({SHEET_ID: book}))
+    stats, frames = measure(
+        lambda _: loader.load_many(SHEET_ID, list(book)), repeats, setup=loader.clear_cache
+    )
+    stats["sheets"] = len(frames)
+    return stats
+
+
+def case_excel_load(n_metrics, n_days, repeats, workdir):
+    from core.loaders import excel_loader
+
+    path = os.path.join(workdir, f"{synthetic.size_label(n_metrics, n_days)}.xlsx")
+    if not os.path.exists(path):
+        synthetic.write_workbook(path, n_metrics, n_days)
+    loader = excel_loader.ExcelLoader(path)
+    stats, df = measure(
+        lambda _: loader.load("Отчет 1"), repeats, setup=excel_loader._sheet_cache.clear
+    )
+    stats["shape"] = list(df.shape)
+    stats["engine"] = loader.engine
+    stats["file_bytes"] = os.path.getsize(path)
+    return stats
+
+
+def case_sources_load(n_metrics, n_days, repeats, workdir):
+    """Папка CSV-выгрузок: листы по очереди и конкурентно (load_all, Config.SOURCE_CONCURRENCY)."""
+    if MANY_SHEETS * n_metrics * n_days > MANY_SHEETS_MAX_CELLS:
+        return None
+    import csv
+
+    from core.sources import base
+    from core.sources.files import FileSource
+
+    folder = os.path.join(workdir, f"csv_{synthetic.size_label(n_metrics, n_days)}")
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+        for i in range(MANY_SHEETS):
+            values = synthetic.sheet_values(n_metrics, n_days, seed=i)
+            with open(os.path.join(folder, f"Отчет {i + 1}.csv"), "w", newline="", encoding="utf-8") as fh:
+                csv.writer(fh, delimiter=";").writerows(values)
+
+    source = FileSource(folder)
+    sheets = source.list_sheets()
+    files = [(FileSource(os.path.join(folder, f"{sheet}.csv")), [sheet]) for sheet in sheets]
+    out = {}
+    out["sequential"], _ = measure(lambda _: source.load_many(sheets), repeats, setup=base._frames.clear)
+    out["concurrent"], frames = measure(lambda _: base.load_all(files), repeats, setup=base._frames.clear)
+    out["concurrent"]["sheets"] = len(frames)
+    out["concurrent"]["concurrency"] = Config.SOURCE_CONCURRENCY
+    return out
+
+
+def _processor(n_metrics, n_days):
+    from core.processor import DataProcessor
+
+    processor = DataProcessor()
+    processor.load_from_gsheet(synthetic.sheet_frame(n_metrics, n_days), "Отчет 1")
+    return processor
+
+
+def case_process_data(n_metrics, n_days, repeats):
+    processor = _processor(n_metrics, n_days)
+    rnd = random.Random(1)
+
+    def random_range():
+        a = rnd.randint(1, n_days)
+        return [a, rnd.randint(a, n_days)]
+
+    stats, _ = measure(
+        lambda day_range: processor.process_data(day_range, include_raw=False),
+        repeats, setup=random_range,
+    )
+    return stats
+
+
+def case_top_reasons(n_metrics, n_days, repeats):
+    processor = _processor(n_metrics, n_days)
+    rnd = random.Random(3)
+
+    def random_range():
+        a = rnd.randint(1, n_days)
+        return [a, rnd.randint(a, n_days)]
+
+    stats, _ = measure(lambda day_range: processor.top_reasons(day_range), repeats, setup=random_range)
+    stats["reasons"] = len(processor.reasons)
+    return stats
+
+
+def case_refresh(n_metrics, n_days, repeats):
+    """Новая версия листа: дописана неделя дней и исправлена одна старая ячейка."""
+    from core.matrix import MetricMatrix
+    from core.rollups import Rollup
+
+    new = synthetic.sheet_frame(n_metrics, n_days)
+    old = new.iloc[:, :2 + max(n_days - 7, 1)]
+    new.iat[0, 2] = "1 000"
+    old_matrix = MetricMatrix.from_frame(old)
+    old_rollup = Rollup.build(old_matrix)
+
+    result = {}
+    result["matrix_full"], _ = measure(lambda _: MetricMatrix.from_frame(new), repeats)
+    result["matrix_incremental"], matrix = measure(
+        lambda _: MetricMatrix.from_frame(new, previous=(old, old_matrix)), repeats)
+    result["rollup_full"], _ = measure(lambda _: Rollup.build(matrix), repeats)
+    result["rollup_incremental"], _ = measure(lambda _: old_rollup.update(matrix), repeats)
+    return result
+
+
+def case_charts(n_metrics, n_days, repeats):
+    from viz import charts
+
+    processor = _processor(n_metrics, n_days)
+    _, df_agg = processor.process_data([1, n_days], include_raw=False)
+    staff = processor.dimension_totals("staff", [1, n_days], top_k=Config.STAFF_TOP_K)
+    builders = {
+        "calls_funnel": (charts.make_calls_funnel, df_agg),
+        "staff_bar": (charts.make_staff_bar, staff),
+        "staff_pie": (charts.make_staff_pie, staff),
+        "internet_pie": (charts.make_internet_pie, df_agg),
+    }
+    result = {}
+    for name, (build, data) in builders.items():
+        stats, fig = measure(lambda _: build(data), repeats)
+        stats["payload_bytes"] = len(fig.to_json())
+        result[name] = stats
+    return result
+
+
+class DashBench:
+    """Коллбеки приложения через тестовый клиент Flask — с сериализацией ответа."""
+
+    def __init__(self, books):
+        import app as dash_app
+        import viz.callbacks as cb
+        from core.loaders.gsheet_loader import GoogleSheetsLoader
+
+        self.app = dash_app.app
+        self.cb = cb
+        self.client = dash_app.server.test_client()
+        # Свой лоадер вместо get_loader(): только память процесса, без диска,
+        # общего кэша, фоновых потоков и service_account.json
+        cb._loader = GoogleSheetsLoader("", [], client=synthetic.FakeClient(books))
+        # clientside-коллбеки (без "callback") на сервер не приходят
+        self._specs = {
+            spec["callback"].__name__: spec for spec in self.app.callback_map.values() if "callback" in spec
+        }
+
+    def reset(self):
+        self.cb.get_loader().clear_cache()
+        self.cb.frame_store.clear()
+        self.cb.figure_cache.clear()
+        self.cb.comparison._cache.clear()
+
+    def call(self, name, values, changed):
+        """POST /_dash-update-component; values — {"id.prop": значение} для inputs и state."""
+        spec = self._specs[name]
+
+        def items(deps):
+            return [{"id": d["id"], "property": d["property"],
+                     "value": values.get(f"{d['id']}.{d['property']}")} for d in deps]
+
+        declared = spec["output"] if isinstance(spec["output"], list) else [spec["output"]]
+        outputs = [{"id": o.component_id, "property": o.component_property} for o in declared]
+        body = {
+            "output": next(k for k, v in self.app.callback_map.items() if v is spec),
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": items(spec["inputs"]),
+            "state": items(spec["state"]),
+            "changedPropIds": [changed],
+        }
+        response = self.client.post("/_dash-update-component", json=body)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"{name}: HTTP {response.status_code}")
+        return response
+
+    def response_data(self, response, output_id, prop):
+        if response.status_code == 204:
+            return None
+        return response.get_json()["response"][output_id][prop]
+
+
+def case_callbacks(n_metrics, n_days, repeats):
+    books = {SHEET_ID: synthetic.report_book(2, n_metrics, n_days, two_row_header=True)}
+    bench = DashBench(books)
+    result = {}
+
+    def load(_):
+        return bench.call("load_selected_sheets", {
+            "gsheet-name.value": "Отчет 1",
+            "compare-gsheet-name.value": "Отчет 2",
+            "gsheet-id.value": SHEET_ID,
+        }, "gsheet-name.value")
+
+    stats, response = measure(load, repeats, setup=bench.reset)
+    stats["payload_bytes"] = len(response.data)
+    result["load_selected_sheets"] = stats
+
+    response = load(None)
+    handle = bench.response_data(response, "main-df", "data")
+    compare_handle = bench.response_data(response, "compare-df", "data")
+
+    stats, response = measure(lambda _: bench.call(
+        "update_calls_trend", {"main-df.data": handle}, "main-df.data"), repeats,
+        setup=bench.cb.figure_cache.clear)
+    stats["payload_bytes"] = len(response.data)
+    result["update_calls_trend"] = stats
+    trend_state = bench.response_data(response, "trend-figure-state", "data")
+
+    # Приближение на calls-trend: Patch с точками видимого окна
+    zoom_rnd = random.Random(1)
+
+    def random_zoom():
+        a = zoom_rnd.uniform(1, n_days)
+        return {"width": 1200, "relayout": {"xaxis.range[0]": a, "xaxis.range[1]": zoom_rnd.uniform(a, n_days)}}
+
+    stats, response = measure(lambda view: bench.call(
+        "requery_calls_trend",
+        {"main-df.data": handle, "trend-view.data": view, "trend-figure-state.data": trend_state},
+        "trend-view.data"),
+        repeats, setup=random_zoom)
+    stats["payload_bytes"] = len(response.data)
+    result["requery_calls_trend"] = stats
+
+    rnd = random.Random(2)
+
+    def random_range():
+        a = rnd.randint(1, n_days)
+        return [a, rnd.randint(a, n_days)]
+
+    # Первое построение: у клиента нет фигур — полные фигуры в ответе
+    stats, response = measure(lambda day_range: bench.call(
+        "update_period_charts", {"main-df.data": handle, "day-range.value": day_range},
+        "day-range.value"), repeats, setup=random_range)
+    stats["payload_bytes"] = len(response.data)
+    result["update_period_charts"] = stats
+
+    # Перетаскивание слайдера: фигуры у клиента уже есть — Patch с массивами
+    state = bench.response_data(response, "period-figure-state", "data")
+    stats, response = measure(lambda day_range: bench.call(
+        "update_period_charts", {"main-df.data": handle, "day-range.value": day_range,
+                                 "period-figure-state.data": state},
+        "day-range.value"), repeats, setup=random_range)
+    stats["payload_bytes"] = len(response.data)
+    result["update_period_charts_patch"] = stats
+
+    stats, response = measure(lambda day_range: bench.call(
+        "update_comparison", {"main-df.data": handle, "day-range.value": day_range,
+                              "compare-df.data": compare_handle, "compare-range.value": [1, n_days]},
+        "day-range.value"), repeats, setup=random_range)
+    stats["payload_bytes"] = len(response.data)
+    result["update_comparison"] = stats
+    return result
+
+
+CASES = {
+    "gsheet_load": case_gsheet_load,
+    "gsheet_load_many": case_gsheet_load_many,
+    "excel_load": case_excel_load,
+    "sources_load": case_sources_load,
+    "process_data": case_process_data,
+    "top_reasons": case_top_reasons,
+    "refresh": case_refresh,
+    "charts": case_charts,
+    "callbacks": case_callbacks,
+}
+
+
+# --- запуск и сравнение -------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _flatten(results):
+    """{(случай, размер): замеры}."""
+    flat = {}
+    for item in results:
+        flat[(item["case"], item["size"])] = item
+    return flat
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = _flatten(json.load(fh)["results"])
+    print(f"\n{'случай':<42} {'размер':>9} {'было, мс':>10} {'стало, мс':>10} {'×':>6}")
+    for key, item in _flatten(current).items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = item["median_ms"] / old["median_ms"] if old["median_ms"] else float("nan")
+        print(f"{key[0]:<42} {key[1]:>9} {old['median_ms']:>10.2f} {item['median_ms']:>10.2f} {ratio:>6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+",
+                        default=[synthetic.size_label(*s) for s in synthetic.SIZES],
+                        help="размеры листов: строк x дней")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", help="файл для JSON с результатами")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            n_metrics, n_days = map(int, size.split("x"))
+            for case in args.cases:
+                kwargs = {"workdir": workdir} if case in ("excel_load", "sources_load") else {}
+                measured = CASES[case](n_metrics, n_days, args.repeats, **kwargs)
+                if measured is None:
+                    continue
+                # charts, callbacks, refresh, sources_load возвращают несколько замеров
+                parts = measured.items() if "median_ms" not in measured else [(None, measured)]
+                for part, stats in parts:
+                    name = case if part is None else f"{case}.{part}"
+                    results.append({"case": name, "size": size, **stats})
+                    print(f"{name:<42} {size:>9} {stats['median_ms']:>10.2f} мс "
+                          f"{stats['peak_mb']:>8.1f} МБ {stats.get('payload_bytes', ''):>10}",
+                          file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Синтетические листы в формате наших отчётов — общий генератор для бенчмарков.
+
+Лист: колонки "Показатель", "Ед" и дни "dd.mm"; все ячейки — строки, как их
+отдаёт Google Sheets ("1 234", "12,5", "37%", пустые). Первые строки —
+показатели, которые ищут графики, остальные — "Показатель N".
+Необязательная первая строка-заголовок отчёта (двухстрочная шапка).
+"""
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+# От месяца на 50 строк до года на 2000 строк
+SIZES = [(50, 31), (200, 92), (500, 183), (2000, 366)]
+
+KNOWN_METRICS = [
+    "ВХОДЯЩИЕ ЗВОНКИ - ВЗ",
+    "Принятые ВЗ",
+    "Пропущенные ВЗ",
+    "Непринятые ВЗ",
+    "Переадресованные успешно ВЗ",
+    "Дозвонились ИЗ",
+    "Не обработаны ИЗ",
+    "Не дозвонились ИЗ",
+    *Config.STAFF_NAMES,
+]
+
+
+def size_label(n_metrics, n_days):
+    return f"{n_metrics}x{n_days}"
+
+
+def day_columns(n_days, year=2024):
+    return list(pd.date_range(f"{year}-01-01", periods=n_days, freq="D").strftime("%d.%m"))
+
+
+def metric_labels(n_metrics):
+    labels = KNOWN_METRICS[:n_metrics]
+    return labels + [f"Показатель {i}" for i in range(len(labels), n_metrics)]
+
+
+def _cells(rng, n_metrics, n_days):
+    """Строковые ячейки: в основном целые, немного пустых, тысяч с пробелом, дробей и процентов."""
+    numbers = rng.integers(0, 500, size=(n_metrics, n_days))
+    cells = numbers.astype(str).astype(object)
+    kind = rng.random(size=cells.shape)
+    cells[kind < 0.05] = ""
+    thousands = (kind >= 0.05) & (kind < 0.07)
+    cells[thousands] = [f"1 {n:03d}" for n in numbers[thousands]]
+    fractions = (kind >= 0.07) & (kind < 0.08)
+    cells[fractions] = [f"{n},5" for n in numbers[fractions]]
+    percents = (kind >= 0.08) & (kind < 0.09)
+    cells[percents] = [f"{n % 100}%" for n in numbers[percents]]
+    return cells
+
+
+def sheet_values(n_metrics, n_days, two_row_header=False, seed=0, title="Отчет"):
+    """Сырые значения листа (list[list[str]]) — то, что возвращает get_all_values()."""
+    rng = np.random.default_rng(seed)
+    header = ["Показатель", "Ед"] + day_columns(n_days)
+    rows = [header]
+    if two_row_header:
+        rows.insert(0, [title] + [""] * (len(header) - 1))
+    cells = _cells(rng, n_metrics, n_days)
+    for label, row in zip(metric_labels(n_metrics), cells):
+        rows.append([label, "шт"] + row.tolist())
+    return rows
+
+
+def sheet_frame(n_metrics, n_days, seed=0):
+    """DataFrame листа — как после GoogleSheetsLoader (строки, заголовок разобран)."""
+    values = sheet_values(n_metrics, n_days, seed=seed)
+    return pd.DataFrame(values[1:], columns=values[0])
+
+
+def report_book(n_sheets, n_metrics, n_days, two_row_header=True):
+    """{название листа: значения} — таблица из многих листов «Отчет N»."""
+    return {
+        f"Отчет {i + 1}": sheet_values(n_metrics, n_days, two_row_header, seed=i, title=f"Отчет {i + 1}")
+        for i in range(n_sheets)
+    }
+
+
+def write_workbook(path, n_metrics, n_days, n_sheets=1):
+    """Книга Excel из n_sheets листов «Отчет N» с числовыми ячейками."""
+    rng = np.random.default_rng(0)
+    days = day_columns(n_days)
+    with pd.ExcelWriter(path) as writer:
+        for s in range(n_sheets):
+            df = pd.DataFrame(rng.integers(0, 500, size=(n_metrics, n_days)), columns=days)
+            df.insert(0, "Ед", "шт")
+            df.insert(0, "Показатель", metric_labels(n_metrics))
+            df.to_excel(writer, sheet_name=f"Отчет {s + 1}", index=False)
+
+
+class FakeWorksheet:
+    def __init__(self, title, values):
+        self.title = title
+        self._values = values
+
+    def get_all_values(self):
+        return [list(row) for row in self._values]
+
+
+class FakeSpreadsheet:
+    def __init__(self, sheets):
+        self._sheets = sheets
+
+    def worksheets(self):
+        return [FakeWorksheet(title, values) for title, values in self._sheets.items()]
+
+    def worksheet(self, title):
+        return FakeWorksheet(title, self._sheets[title])
+
+    def values_batch_get(self, ranges):
+        value_ranges = []
+        for a1 in ranges:
+            title = a1[1:-1].replace("''", "'")
+            value_ranges.append({"range": a1, "values": [list(row) for row in self._sheets[title]]})
+        return {"valueRanges": value_ranges}
+
+
+class FakeClient:
+    """Клиент gspread без сети: {sheet_id: {название листа: значения}}."""
+
+    def __init__(self, books):
+        self.books = books
+
+    def open_by_key(self, sheet_id):
+        return FakeSpreadsheet(self.books[sheet_id])
@@ -14,9 +14,98 @@ class Config:
 
     # Остальные настройки
     STAFF_NAMES = ["Мади", "Ильяс"]
+
+    # Измерения листа (core/dimensions.py): строки сотрудников и других сущностей
+    # находятся при загрузке. sections — строки-заголовки без данных, за которыми
+    # идут сущности; patterns — regex с группой (?P<entity>...); seeds — известные
+    # имена, по их строкам выводится шаблон остальных; exclude — не сущности
+    DIMENSIONS = {
+        "staff": {
+            "sections": ["Сотрудники", "По сотрудникам", "Операторы"],
+            "patterns": [],
+            "seeds": STAFF_NAMES,
+            "exclude": ["Итого", "Всего"],
+        },
+    }
+    # Сотрудников на графиках: топ-K, остальные — одним столбцом «Прочие» (None — все)
+    STAFF_TOP_K = 15
+
+    # Синонимы показателей: одна и та же строка в разных листах называется по-разному.
+    # Регистр, ё/е, тире и пробелы выравниваются автоматически (core/metric_index.py)
+    METRIC_ALIASES = {
+        "Входящие звонки - ВЗ": ["Входящие ВЗ", "Всего входящих"],
+        "Переадресованные успешно ВЗ": ["Переадресовано успешно ВЗ"],
+    }
+    # Блок причин: с этой строки DataFrame листа (с 0) и до конца; показываем топ-N
     REASONS_START_ROW = 37
     MAX_REASONS_DISPLAY = 10
 
+    # Заголовок листа (core/sources/header.py): первая из первых HEADER_SCAN_ROWS строк
+    # с одним из маркеров; строки над ней — шапка отчёта
+    HEADER_MARKERS = ["Показатель", "Модель"]
+    HEADER_SCAN_ROWS = 5
+
+    # Источники данных (core/sources): сколько загрузок идёт одновременно (asyncio)
+    # и сколько разобранных листов файловых источников (Excel, CSV/Parquet) держим в памяти
+    SOURCE_CONCURRENCY = 4
+    SOURCE_CACHE_MAX_ENTRIES = 64
+
+    # Серверный реестр DataFrame'ов (в dcc.Store уходит только handle)
+    FRAME_STORE_MAX_BYTES = 512 * 1024 * 1024
+
+    # Кэш листов Google Sheets: максимум записей и время жизни (сек)
+    GSHEET_CACHE_MAX_ENTRIES = 64
+    GSHEET_CACHE_TTL = 300
+
+    # Лимит запросов к Google Sheets API на процесс (квота чтения — 60/мин на пользователя)
+    GSHEET_RATE_LIMIT_PER_MINUTE = 60
+    GSHEET_RATE_BURST = 10
+
+    # Фоновое обновление листов: интервал проверки (сек) и разброс (доля интервала).
+    # Пока проверка идёт, коллбеки получают кэшированную копию
+    GSHEET_REFRESH_INTERVAL = 120
+    GSHEET_REFRESH_JITTER = 0.2
+    # Лист, который не открывали дольше этого (сек), больше не проверяется
+    GSHEET_REFRESH_IDLE = 30 * 60
+    # Как часто страница перечитывает выбранный лист из кэша (мс)
+    UI_REFRESH_INTERVAL_MS = 60 * 1000
+
+    # Снимки листов на диске (Arrow/Feather): тёплый старт и офлайн-режим
+    SNAPSHOT_DIR = os.path.join(BASE_DIR, "cache", "snapshots")
+    SNAPSHOT_MAX_AGE = 15 * 60  # сек; старше — только если Google недоступен
+
+    # Общий кэш разобранных листов для всех воркеров gunicorn (memory map + flock).
+    # /dev/shm — в памяти; если его нет, обычный диск (страницы всё равно делит page cache).
+    # Каталог свой у каждого пользователя: SharedCache не работает в чужом каталоге
+    SHARED_CACHE_DIR = (
+        f"/dev/shm/sales-dashboard-{os.getuid()}" if os.path.isdir("/dev/shm")
+        else os.path.join(BASE_DIR, "cache", "shared")
+    )
+    SHARED_CACHE_TTL = GSHEET_CACHE_TTL
+    # Матрицы листов в общем кэше: версий на лист (текущая и прошлая) и всего байт
+    SHARED_CACHE_MATRIX_VERSIONS = 2
+    SHARED_CACHE_MATRIX_MAX_BYTES = 256 * 1024 * 1024
+
+    # Кэш готовых Plotly-фигур (LRU)
+    FIGURE_CACHE_MAX_ENTRIES = 256
+
+    # График calls-trend: длинные ряды прореживаются под ширину графика в пикселях
+    # (lttb — сохраняет форму, minmax — минимум и максимум по корзинам, None — все точки).
+    # Ширину присылает браузер, до этого — TREND_DEFAULT_WIDTH_PX. При приближении
+    # видимый диапазон запрашивается заново, и точек снова хватает на точные значения
+    TREND_DOWNSAMPLE = "lttb"
+    TREND_DEFAULT_WIDTH_PX = 1200
+    TREND_POINTS_PER_PX = 0.5
+    # Больше точек на графике — WebGL (Scattergl) вместо SVG
+    TREND_WEBGL_THRESHOLD = 1000
+
+    # Создать лоадер и сделать тяжёлые импорты при старте, а не при первом запросе.
+    # Имеет смысл с gunicorn --preload: мастер делает это один раз до fork воркеров
+    EAGER_STARTUP = os.environ.get("EAGER_STARTUP", "0") == "1"
+
+    # Метрики Prometheus на /metrics; METRICS_ENABLED=0 выключает всю инструментацию
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
     COLORS = {
         "primary": "#1976D2",
         "success": "green",
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру кэш с истечением записей по времени.
+
+    Вытеснение — LRU при превышении maxsize, истёкшие записи считаются
+    промахом. Счётчики hits/misses/evictions/expirations доступны через stats().
+
+    get(..., allow_stale=True) отдаёт и истёкшую запись (stale-while-revalidate):
+    она остаётся в кэше до перезаписи или вытеснения, счётчик — stale_hits.
+    """
+
+    def __init__(self, maxsize=128, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+
+    def get(self, key, default=None, allow_stale=False):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= self._clock():
+                if allow_stale:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def is_stale(self, key):
+        """Запись есть, но её время жизни вышло."""
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[1] is not None and item[1] <= self._clock()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale_hits": self.stale_hits,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and (item[1] is None or item[1] > self._clock())
+
+    def __len__(self):
+        return len(self._data)
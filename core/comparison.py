@@ -0,0 +1,79 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache
+from core.metric_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+class ComparisonEngine:
+    """
+    Сравнение двух периодов (одного листа или разных) по всем показателям сразу.
+
+    Суммы периодов берутся из DataProcessor.process_data, показатели
+    сопоставляются по нормализованному названию (outer join: строка, которой
+    нет в одном из периодов, остаётся с NaN). Результаты кэшируются по
+    (версия A, диапазон A, версия B, диапазон B), поэтому переключение между
+    уже посчитанными сравнениями ничего не пересчитывает.
+    """
+
+    def __init__(self, cache_maxsize=128):
+        self._cache = TTLCache(maxsize=cache_maxsize, ttl=0)
+
+    @staticmethod
+    def _period_totals(processor, day_range):
+        _, df_agg = processor.process_data(day_range, include_raw=False)
+        if df_agg.empty:
+            return pd.DataFrame(columns=["Показатель", "Сумма за период", "key"])
+        df_agg = df_agg.assign(key=df_agg["Показатель"].fillna("").map(normalize_name))
+        # пустые строки-разделители не сравниваем, дубли — первая строка (как в MetricIndex)
+        df_agg = df_agg[df_agg["key"] != ""]
+        return df_agg.drop_duplicates("key", keep="first")
+
+    def compare(self, processor_a, range_a, processor_b, range_b, version_a=None, version_b=None):
+        """
+        DataFrame: Показатель, Период A, Период B, Разница (A − B), Разница, %.
+        Период B — база для процента; при нулевой базе процент NaN.
+        """
+        cache_key = None
+        if version_a is not None and version_b is not None:
+            cache_key = (version_a, tuple(range_a), version_b, tuple(range_b))
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        a = self._period_totals(processor_a, range_a)
+        b = self._period_totals(processor_b, range_b)
+
+        # Порядок строк — как в листе A, затем строки, которые есть только в B
+        sums_a = a.set_index("key")["Сумма за период"]
+        sums_b = b.set_index("key")["Сумма за период"]
+        keys = sums_a.index.append(sums_b.index.difference(sums_a.index, sort=False))
+
+        values_a = sums_a.reindex(keys).to_numpy(dtype=np.float64)
+        values_b = sums_b.reindex(keys).to_numpy(dtype=np.float64)
+        delta = values_a - values_b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta_pct = np.where(values_b != 0, delta / values_b * 100, np.nan)
+
+        labels = a.set_index("key")["Показатель"].reindex(keys)
+        labels = labels.fillna(b.set_index("key")["Показатель"].reindex(keys))
+
+        result = pd.DataFrame({
+            "Показатель": labels.to_numpy(),
+            "Период A": values_a,
+            "Период B": values_b,
+            "Разница": delta,
+            "Разница, %": delta_pct,
+        })
+
+        if cache_key is not None:
+            self._cache.set(cache_key, result)
+        logger.info(f"[COMPARISON] {len(result)} показателей: {range_a} vs {range_b}")
+        return result
+
+    def cache_stats(self):
+        return self._cache.stats()
@@ -0,0 +1,189 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from core.metric_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+# Имя сущности в строке по шаблону: одно слово из букв (дефис и апостроф внутри)
+_NAME_TOKEN = r"[^\W\d_][\w'-]*"
+
+
+def _word_pattern(name):
+    return re.compile(r"(?<!\w)" + re.escape(name) + r"(?!\w)", re.IGNORECASE)
+
+
+def _known_metrics():
+    """Нормализованные названия показателей из таблицы синонимов — это не сущности."""
+    names = set()
+    for canonical, alternatives in Config.METRIC_ALIASES.items():
+        names.add(normalize_name(canonical))
+        names.update(normalize_name(a) for a in alternatives)
+    return names
+
+
+class DimensionTable:
+    """
+    Таблица измерений листа: какие строки относятся к сотрудникам (и другим
+    сущностям) и к какой сущности. Строится один раз на загрузку по
+    Config.DIMENSIONS, строки находятся тремя способами:
+
+    - sections: строка-заголовок ("Сотрудники"), за ней — сущности до пустой
+      строки или строки, которая сама заголовок секции или известный показатель.
+      Сущность без данных (новый сотрудник, отпуск) секцию не обрывает;
+    - patterns: регулярные выражения с группой (?P<entity>...);
+    - seeds: известные имена (Config.STAFF_NAMES). Первая строка с именем — сущность,
+      а если в ней есть что-то кроме имени ("Переадресовано Мади"), из неё
+      выводится шаблон. Шаблон работает, только если к нему привели не меньше
+      template_min_seeds имён (по умолчанию 2), и строка того же вида становится
+      сущностью, только если на месте имени одно слово и сама строка —
+      не известный показатель ("Переадресовано успешно ВЗ").
+
+    Одна сущность может занимать несколько строк — их значения складываются.
+
+    Суммы по сущностям за период — одна векторная группировка (np.bincount)
+    по накопленным суммам MetricMatrix.
+    """
+
+    def __init__(self, groups):
+        # dimension -> (строки матрицы, коды сущностей, названия сущностей)
+        self._groups = groups
+
+    @classmethod
+    def detect(cls, matrix, dimensions=None):
+        dimensions = Config.DIMENSIONS if dimensions is None else dimensions
+        labels = matrix.labels
+        # Строки, на которых секция заканчивается: заголовки всех секций и показатели
+        stop_rows = _known_metrics() | {
+            normalize_name(s) for spec in dimensions.values() for s in spec.get("sections", ())
+        }
+
+        groups = {}
+        for name, spec in dimensions.items():
+            exclude = {normalize_name(e) for e in spec.get("exclude", ())}
+            found = {}  # строка -> название сущности
+
+            for row, entity in cls._section_rows(labels, spec.get("sections", ()), stop_rows):
+                found.setdefault(row, entity)
+
+            patterns = [re.compile(p, re.IGNORECASE) for p in spec.get("patterns", ())]
+            templates = cls._seed_patterns(
+                labels, found, spec.get("seeds", ()), spec.get("template_min_seeds", 2)
+            )
+            metrics = _known_metrics() | exclude
+            for row, label in enumerate(labels):
+                if row in found or not label:
+                    continue
+                for pattern in patterns:
+                    m = pattern.match(label)
+                    if m:
+                        found[row] = (m.groupdict().get("entity") or label).strip()
+                        break
+                else:
+                    if normalize_name(label) in metrics:
+                        continue
+                    for template in templates:
+                        m = template.match(label)
+                        if m and normalize_name(m.group("entity")) not in metrics:
+                            found[row] = m.group("entity")
+                            break
+
+            rows, codes, entities, keys = [], [], [], {}
+            for row in sorted(found):
+                key = normalize_name(found[row])
+                if not key or key in exclude:
+                    continue
+                if key not in keys:
+                    keys[key] = len(entities)
+                    entities.append(found[row])
+                rows.append(row)
+                codes.append(keys[key])
+
+            groups[name] = (np.array(rows, dtype=np.intp), np.array(codes, dtype=np.intp), entities)
+            logger.info(f"[DIMENSIONS] {name}: {len(entities)} сущностей в {len(rows)} строках")
+        return cls(groups)
+
+    @staticmethod
+    def _section_rows(labels, sections, stop_rows):
+        headers = {normalize_name(s) for s in sections}
+        if not headers:
+            return
+        inside = False
+        for row, label in enumerate(labels):
+            key = normalize_name(label)
+            if not key:
+                inside = False
+            elif key in headers or key in stop_rows:
+                # заголовок: наша секция или чужая / показатель
+                inside = key in headers
+            elif inside:
+                # пустая по данным строка — тоже сущность, а не конец секции
+                yield row, label
+
+    @staticmethod
+    def _seed_patterns(labels, found, seeds, min_seeds=2):
+        """
+        Строки с известными именами -> в found; шаблоны строк того же вида,
+        к которым привели не меньше min_seeds имён, -> список.
+        """
+        patterns, votes = {}, {}
+        known = {normalize_name(entity) for entity in found.values()}
+        for seed in seeds:
+            if normalize_name(seed) in known:  # уже нашёлся в секции
+                continue
+            seed_re = _word_pattern(seed)
+            # Как в MetricIndex: при нескольких строках с именем берём первую
+            for row, label in enumerate(labels):
+                m = seed_re.search(label) if label and row not in found else None
+                if m is None:
+                    continue
+                found[row] = seed
+                prefix, suffix = label[:m.start()].strip(), label[m.end():].strip()
+                if prefix or suffix:
+                    template = (
+                        "^" + re.escape(prefix) + r"\s*(?P<entity>" + _NAME_TOKEN + r")\s*" + re.escape(suffix) + "$"
+                    )
+                    patterns.setdefault(template, re.compile(template, re.IGNORECASE))
+                    votes[template] = votes.get(template, 0) + 1
+                break
+        return [pattern for template, pattern in patterns.items() if votes[template] >= min_seeds]
+
+    def entities(self, dimension):
+        return list(self._groups[dimension][2]) if dimension in self._groups else []
+
+    def rows(self, dimension):
+        return self._groups[dimension][0] if dimension in self._groups else np.array([], dtype=np.intp)
+
+    def totals(self, matrix, start, end, dimension, top_k=None, others_label="Прочие"):
+        """
+        DataFrame (Сущность, Значение) за колонки [start, end) по убыванию.
+        top_k — оставить k крупнейших, остальное сложить в строку others_label.
+        """
+        rows, codes, entities = self._groups.get(
+            dimension, (np.array([], dtype=np.intp), np.array([], dtype=np.intp), [])
+        )
+        if not len(rows):
+            return pd.DataFrame({"Сущность": [], "Значение": []})
+
+        n_cols = matrix.shape[1]
+        start, end = max(0, start), min(n_cols, end)
+        if end > start:
+            sums = matrix.prefix[rows, end] - matrix.prefix[rows, start]
+        else:
+            sums = np.zeros(len(rows), dtype=np.float64)
+        totals = np.bincount(codes, weights=sums, minlength=len(entities))
+
+        order = np.lexsort((np.arange(len(totals)), -totals))
+        names = np.asarray(entities, dtype=object)
+        if top_k is not None and len(order) > top_k:
+            head, tail = order[:top_k], order[top_k:]
+            return pd.DataFrame({
+                "Сущность": np.append(names[head], others_label),
+                "Значение": np.append(totals[head], totals[tail].sum()),
+            })
+        return pd.DataFrame({"Сущность": names[order], "Значение": totals[order]})
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: индексы n_out точек, сохраняющих форму ряда.
+    Первая и последняя точка остаются; из каждой корзины берётся точка,
+    дающая наибольший треугольник с предыдущей выбранной и средним следующей корзины.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Границы n_out - 2 корзин между первой и последней точкой
+    bounds = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.intp) + 1
+    bounds[-1] = n - 1
+
+    # Средние следующих корзин от выбранной точки не зависят — считаем разом
+    sizes = np.diff(np.append(bounds, n))
+    avg_x = np.add.reduceat(x, bounds) / sizes
+    avg_y = np.add.reduceat(y, bounds) / sizes
+
+    picked = np.empty(n_out, dtype=np.intp)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def minmax_indices(y, n_out):
+    """Минимум и максимум каждой из (n_out - 2) / 2 корзин плюс края — пики не теряются."""
+    n = len(y)
+    n_buckets = max((n_out - 2) // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    bounds = np.linspace(0, n, n_buckets + 1).astype(np.intp)
+    group = np.repeat(np.arange(n_buckets), np.diff(bounds))
+    # Внутри корзины по возрастанию значения: первый — минимум, последний — максимум
+    order = np.lexsort((y, group))
+    picked = np.concatenate(([0, n - 1], order[bounds[:-1]], order[bounds[1:] - 1]))
+    return np.unique(picked)
+
+
+METHODS = {
+    "lttb": lambda y, n_out: lttb_indices(np.arange(len(y)), y, n_out),
+    "minmax": minmax_indices,
+}
+
+
+def downsample(y, n_out, method="lttb"):
+    """
+    Индексы точек ряда y для показа не более чем n_out точками.
+    Если ряд помещается — все индексы (с пропусками NaN, как есть);
+    иначе прореживаются только заполненные точки.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if method is None or len(y) <= n_out:
+        return np.arange(len(y))
+
+    filled = np.flatnonzero(~np.isnan(y))
+    if len(filled) <= n_out:
+        return filled
+    return filled[METHODS[method](y[filled], n_out)]
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _nbytes(value, seen, depth=3):
+    """
+    Примерный объём массивов в объекте: DataFrame / Series / ndarray, в том числе
+    внутри словарей, списков и атрибутов объектов (до depth уровней).
+    Объекты из seen не считаются повторно — матрица внутри процессора и т.п.
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if depth == 0:
+        return 0
+    if isinstance(value, dict):
+        items = value.values()
+    elif isinstance(value, (list, tuple)):
+        items = value
+    elif hasattr(value, "__dict__"):
+        items = vars(value).values()
+    else:
+        return 0
+    return sum(_nbytes(item, seen, depth - 1) for item in items)
+
+
+class FrameStore:
+    """
+    Серверный реестр DataFrame'ов.
+
+    Кадры хранятся в памяти процесса под ключом (sheet_id, worksheet, version),
+    а в dcc.Store браузеру отдаётся только маленький handle (dict с этими полями).
+    Суммарный объём — кадры вместе с производными объектами (матрица, итоги,
+    процессор) — ограничен бюджетом памяти, при превышении вытесняются
+    давно не использованные кадры (LRU).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def fingerprint(df):
+        """Короткий отпечаток содержимого — используется как version по умолчанию."""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_handle(sheet_id, worksheet, version):
+        return {"sheet_id": sheet_id, "worksheet": worksheet, "version": version}
+
+    @staticmethod
+    def _key(handle):
+        return handle["sheet_id"], handle["worksheet"], handle["version"]
+
+    def put(self, sheet_id, worksheet, df, version=None):
+        """Положить кадр в реестр и вернуть handle для dcc.Store."""
+        if version is None:
+            version = self.fingerprint(df)
+        handle = self.make_handle(sheet_id, worksheet, version)
+        key = self._key(handle)
+
+        with self._lock:
+            # Та же версия уже лежит — оставляем её вместе с производными объектами
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return handle
+
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old["size"]
+            # seen — уже посчитанные объекты кадра, чтобы производные не считались дважды
+            self._entries[key] = {"df": df, "size": size, "derived": {}, "seen": {id(df)}}
+            self._total_bytes += size
+            self._evict()
+
+        logger.info(f"[FRAME STORE] Сохранён кадр {key}, {size} байт, всего {self._total_bytes}")
+        return handle
+
+    def get(self, handle):
+        """Вернуть кадр по handle или None, если его нет (вытеснен / другой процесс)."""
+        if not handle:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(handle))
+            if entry is None:
+                return None
+            self._entries.move_to_end(self._key(handle))
+            return entry["df"]
+
+    def derived(self, handle, name, factory):
+        """
+        Вернуть производный объект кадра (матрица, индекс и т.п.), построив его
+        один раз через factory(df). Живёт и вытесняется вместе с кадром.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(handle))
+            if entry is None:
+                return None
+            self._entries.move_to_end(self._key(handle))
+            if name in entry["derived"]:
+                return entry["derived"][name]
+            df = entry["df"]
+
+        value = factory(df)
+        with self._lock:
+            entry = self._entries.get(self._key(handle))
+            if entry is not None and name not in entry["derived"]:
+                entry["derived"][name] = value
+                # Производные объекты живут вместе с кадром — и в бюджете тоже
+                size = _nbytes(value, entry["seen"])
+                entry["size"] += size
+                self._total_bytes += size
+                self._evict()
+            elif entry is not None:
+                value = entry["derived"][name]
+        return value
+
+    def previous(self, handle):
+        """
+        Другая версия того же листа, к которой обращались последней, — (кадр,
+        производные объекты) или None. По ней новая версия пересчитывается
+        частично (MetricMatrix.from_frame, Rollup.update).
+        """
+        sheet = handle["sheet_id"], handle["worksheet"]
+        with self._lock:
+            for (sheet_id, worksheet, version), entry in reversed(self._entries.items()):
+                if (sheet_id, worksheet) == sheet and version != handle["version"]:
+                    return entry["df"], dict(entry["derived"])
+        return None
+
+    def _evict(self):
+        # Последний добавленный кадр не вытесняем, даже если он один больше бюджета
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry["size"]
+            logger.info(f"[FRAME STORE] Вытеснен кадр {key}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,24 +1,133 @@
 import pandas as pd
+import importlib.util
 import os
 import logging
 
+from core.cache import TTLCache
+from core.sources.header import frame_from_rows
+
+# Быстрый Rust-движок для pd.read_excel; проверяем наличие без импорта.
+# openpyxl тоже импортируется только при первом чтении книги
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
 logger = logging.getLogger(__name__)
 
+# Разобранные листы и списки листов всех книг процесса: (путь, mtime, лист) -> значение
+_sheet_cache = TTLCache(maxsize=32, ttl=0)
+
+
 class ExcelLoader:
-    def __init__(self, excel_path):
+    """
+    Загрузка листов из Excel.
+
+    engine:
+    - "auto"      — calamine, если установлен, иначе потоковый openpyxl;
+    - "stream"    — openpyxl read_only: читаются только значения нужного листа;
+    - "calamine"  — python-calamine (Rust), строки листа целиком
+      (необязательный, requirements-optional.txt);
+    - "pandas"    — прежний путь через pd.ExcelFile.
+    """
+
+    def __init__(self, excel_path, snapshot_cache=None, engine="auto"):
         self.excel_path = excel_path
+        self.snapshot_cache = snapshot_cache
+        if engine == "auto":
+            engine = "calamine" if HAS_CALAMINE else "stream"
+        self.engine = engine
+
+    def _snapshot_key(self, target_sheet_name):
+        return f"excel:{os.path.abspath(self.excel_path)}:{target_sheet_name or '__default__'}"
 
     def load(self, target_sheet_name=None):
         if not os.path.exists(self.excel_path):
             raise FileNotFoundError(f"Файл не найден: {self.excel_path}")
 
-        xl = pd.ExcelFile(self.excel_path)
-        if target_sheet_name and target_sheet_name in xl.sheet_names:
+        # Снимок валиден, пока у файла тот же mtime
+        revision = os.stat(self.excel_path).st_mtime_ns
+        if self.snapshot_cache is not None:
+            df = self.snapshot_cache.load(self._snapshot_key(target_sheet_name), revision=revision)
+            if df is not None:
+                return df
+
+        df = self._parse(target_sheet_name)
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.save(self._snapshot_key(target_sheet_name), df, revision=revision)
+        return df
+
+    def sheet_names(self):
+        path = os.path.abspath(self.excel_path)
+        cache_key = (path, os.stat(path).st_mtime_ns, "__sheet_names__")
+        names = _sheet_cache.get(cache_key)
+        if names is None:
+            from openpyxl import load_workbook
+
+            # read_only не разбирает листы, только workbook.xml
+            wb = load_workbook(path, read_only=True)
+            try:
+                names = list(wb.sheetnames)
+            finally:
+                wb.close()
+            _sheet_cache.set(cache_key, names)
+        return names
+
+    def _parse(self, target_sheet_name=None):
+        sheet_names = self.sheet_names()
+        if target_sheet_name and target_sheet_name in sheet_names:
             logger.info(f"Загружаем выбранный лист: {target_sheet_name}")
-            return xl.parse(target_sheet_name)
+            return self.read_sheet(target_sheet_name)
         else:
-            sheet_names = [s for s in xl.sheet_names if s.startswith("Отчет")]
+            sheet_names = [s for s in sheet_names if s.startswith("Отчет")]
             if not sheet_names:
                 raise ValueError("Не найдены листы, начинающиеся с 'Отчет'")
             logger.info(f"Загружаем лист по умолчанию: {sheet_names[0]}")
-            return xl.parse(sheet_names[0])
+            return self.read_sheet(sheet_names[0])
+
+    def read_sheet(self, sheet=0):
+        """
+        Прочитать один лист (имя или номер). Заголовок находится и нормализуется
+        так же, как у остальных источников (core/sources/header.py).
+        Результат кэшируется по (путь, mtime, лист) на весь процесс.
+        """
+        path = os.path.abspath(self.excel_path)
+        cache_key = (path, os.stat(path).st_mtime_ns, sheet)
+        df = _sheet_cache.get(cache_key)
+        if df is not None:
+            return df
+
+        df = frame_from_rows(self.read_rows(sheet))
+        _sheet_cache.set(cache_key, df)
+        return df
+
+    def read_rows(self, sheet=0):
+        """Сырые строки листа (list[list]) без кэша; пустые ячейки — None, "" или NaN."""
+        if self.engine == "stream":
+            return self._read_stream(sheet)
+        if self.engine == "calamine":
+            return self._read_calamine(sheet)
+        # dtype=object: значения как есть, без вывода типов по колонкам
+        # (иначе заголовок "01.05" над числами превратился бы в 1.05)
+        raw = pd.ExcelFile(self.excel_path).parse(sheet, header=None, dtype=object)
+        return raw.to_numpy(dtype=object).tolist()
+
+    def _read_calamine(self, sheet):
+        # Напрямую, без pd.read_excel: обёртка pandas переводит каждую ячейку
+        # отдельным вызовом Python, а to_python() отдаёт строки листа целиком
+        from python_calamine import CalamineWorkbook
+
+        wb = CalamineWorkbook.from_path(self.excel_path)
+        try:
+            ws = wb.get_sheet_by_name(sheet) if isinstance(sheet, str) else wb.get_sheet_by_index(sheet)
+            return ws.to_python()
+        finally:
+            wb.close()
+
+    def _read_stream(self, sheet):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.excel_path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if isinstance(sheet, str) else wb.worksheets[sheet]
+            # read_only-режим не знает реальных границ — хвосты срезает frame_from_rows
+            return [list(row) for row in ws.iter_rows(values_only=True)]
+        finally:
+            wb.close()
@@ -1,16 +1,47 @@
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import hashlib
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import metrics
+from core.cache import TTLCache
+from core.ratelimit import Backoff, TokenBucket
+from core.singleflight import SingleFlight
+from core.sources.header import find_header_row, normalize_header, trim_rows
 
 logger = logging.getLogger(__name__)
 
+# stage: auth / fetch / header / frame
+_STAGE_SECONDS = metrics.histogram(
+    "gsheet_stage_seconds", "Этапы загрузки листа Google Sheets, сек", ["stage"])
+# source: memory / snapshot / google (в том числе через общий кэш воркеров)
+_LOAD_SECONDS = metrics.histogram(
+    "gsheet_load_seconds", "GoogleSheetsLoader.load целиком, сек", ["source"])
+_LOAD_MANY_SECONDS = metrics.histogram(
+    "gsheet_load_many_seconds", "GoogleSheetsLoader.load_many целиком, сек")
+
+
+def _is_api_error(error):
+    # gspread тянет google-auth и requests — импортируем только когда он нужен
+    from gspread.exceptions import APIError
+    return isinstance(error, APIError)
+
+
+class _BatchUnavailable(Exception):
+    """batchGet недоступен или не удался — грузим листы по одному."""
+
 
 class GoogleSheetsLoader:
-    def __init__(self, service_account_file, scopes):
-        # ✅ ДОБАВЛЕНА ПРОВЕРКА ФАЙЛА
-        if not os.path.exists(service_account_file):
+    def __init__(self, service_account_file, scopes, client=None,
+                 cache_maxsize=64, cache_ttl=300.0, max_workers=4,
+                 snapshot_cache=None, snapshot_max_age=None,
+                 rate_limit_per_minute=None, rate_burst=10, backoff=None,
+                 shared_cache=None, clock=time.monotonic):
+        # Готовый клиент (например, фейковый в тестах) — файл ключа не нужен
+        if client is None and not os.path.exists(service_account_file):
             raise FileNotFoundError(
                 f"Service account файл не найден: {service_account_file}\n"
                 f"Создайте файл service_account.json в папке resources/"
@@ -18,71 +49,427 @@ class GoogleSheetsLoader:
 
         self.service_account_file = service_account_file
         self.scopes = scopes
-        self._cache = {}
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._cache = TTLCache(maxsize=cache_maxsize, ttl=cache_ttl, clock=clock)
+        # Открытые таблицы: open_by_key стоит отдельного запроса метаданных
+        self._spreadsheets = TTLCache(maxsize=cache_maxsize, ttl=cache_ttl, clock=clock)
+        # Снимки на диске: тёплый старт после рестарта и работа без Google
+        self.snapshot_cache = snapshot_cache
+        self.snapshot_max_age = snapshot_max_age
+        # Ограниченный пул для параллельных запросов листов
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gsheet")
+        # Отдельный поток для фоновой предзагрузки, чтобы не занимать пул запросов
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gsheet-prefetch")
+        # Фоновое обновление (RefreshScheduler): пока оно подключено, истёкшая
+        # запись кэша отдаётся сразу, а свежая копия грузится в фоне
+        self.refresh_scheduler = None
+        self._content_hashes = {}
+        self._modified_times = {}
+        # Одновременные запросы одного листа склеиваются в один поход в Google,
+        # а все походы проходят через лимит запросов и повтор при ошибках квоты
+        self._flights = SingleFlight()
+        self._rate_limiter = (
+            TokenBucket(rate=rate_limit_per_minute / 60.0, capacity=rate_burst)
+            if rate_limit_per_minute else None
+        )
+        self._backoff = backoff or Backoff()
+        # Общий кэш воркеров gunicorn (SharedCache): лист грузит из Google
+        # один процесс, остальные читают его копию через memory map
+        self.shared_cache = shared_cache
+
+    def _google(self, fn, *args):
+        """Вызов Google API: токен лимитера, затем повторы с backoff при 429."""
+        def attempt():
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            return fn(*args)
+        return self._backoff.call(attempt)
+
+    def _get_client(self):
+        """
+        Долгоживущий авторизованный клиент.
+        gspread ходит через AuthorizedSession: токен обновляется сам,
+        HTTP-соединения переиспользуются между запросами.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import gspread
+                    from google.oauth2.service_account import Credentials
+
+                    with _STAGE_SECONDS.time("auth"):
+                        creds = Credentials.from_service_account_file(
+                            self.service_account_file,
+                            scopes=self.scopes,
+                        )
+                        self._client = gspread.authorize(creds)
+                    logger.info("[GSHEET LOADER] Создан авторизованный клиент")
+        return self._client
+
+    def reset_client(self):
+        """Сбросить клиента — следующий запрос авторизуется заново."""
+        with self._client_lock:
+            self._client = None
+        self._spreadsheets.clear()
+
+    def _open(self, sheet_id):
+        spreadsheet = self._spreadsheets.get(sheet_id)
+        if spreadsheet is None:
+            spreadsheet = self._google(self._get_client().open_by_key, sheet_id)
+            self._spreadsheets.set(sheet_id, spreadsheet)
+        return spreadsheet
 
     def list_sheets(self, sheet_id: str):
         """
         Вернуть список названий листов в указанной таблице.
+        Список сохраняется рядом со снимками листов: без Google отдаётся последний.
         """
+        snapshot_key = self._snapshot_key(sheet_id, "__sheets__")
         try:
-            creds = Credentials.from_service_account_file(
-                self.service_account_file,
-                scopes=self.scopes,
-            )
-            client = gspread.authorize(creds)
-            sh = client.open_by_key(sheet_id)
-            worksheets = sh.worksheets()
-            return [ws.title for ws in worksheets]
+            sh = self._open(sheet_id)
+            worksheets = self._google(sh.worksheets)
+            names = [ws.title for ws in worksheets]
         except Exception as e:
             logger.error(f"Ошибка получения списка листов: {e}")
+            if self.snapshot_cache is not None:
+                df = self.snapshot_cache.load(snapshot_key)
+                if df is not None:
+                    logger.warning(f"[GSHEET LOADER] Google недоступен, отдаю сохранённый список листов: {sheet_id}")
+                    return df["Лист"].tolist()
             raise
 
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.save(snapshot_key, pd.DataFrame({"Лист": names}))
+        return names
+
+    @staticmethod
+    def _build_frame(values):
+        """Определить строку заголовка и собрать DataFrame из сырых значений листа."""
+        if not values:
+            raise ValueError("Лист пуст")
+
+        # Общий для всех источников разбор (core/sources/header.py)
+        with _STAGE_SECONDS.time("header"):
+            rows = trim_rows(values)
+            # Без маркера заголовок — вторая строка, как было у лоадера всегда:
+            # первая в листах Google — название отчёта
+            header_row_index = find_header_row(rows, default=1)
+            header = normalize_header(rows[header_row_index]) if rows else []
+
+        with _STAGE_SECONDS.time("frame"):
+            df = pd.DataFrame(rows[header_row_index + 1:], columns=header)
+
+        logger.info(
+            f"[GSHEET LOADER] Загружено: {df.shape}, "
+            f"header_row_index={header_row_index}"
+        )
+        return df
+
+    @staticmethod
+    def _snapshot_key(sheet_id, sheet_name):
+        return f"gsheet:{sheet_id}:{sheet_name}"
+
+    @staticmethod
+    def _content_hash(values):
+        digest = hashlib.blake2b(digest_size=16)
+        for row in values:
+            digest.update("\x1f".join(row).encode("utf-8"))
+            digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    def _store(self, cache_key, df, values=None, content_hash=None):
+        self._cache.set(cache_key, df)
+        if values is not None:
+            content_hash = self._content_hash(values)
+        if content_hash is not None:
+            self._content_hashes[cache_key] = content_hash
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.save(self._snapshot_key(*cache_key), df)
+
+    def _load_snapshot(self, cache_key, max_age=None):
+        if self.snapshot_cache is None:
+            return None
+        df = self.snapshot_cache.load(self._snapshot_key(*cache_key), max_age=max_age)
+        if df is not None:
+            self._cache.set(cache_key, df)
+        return df
+
+    def _offline_snapshot(self, cache_key):
+        """Google недоступен — отдать последний снимок любой давности."""
+        df = self._load_snapshot(cache_key)
+        if df is not None:
+            logger.warning(f"[GSHEET LOADER] Google недоступен, отдаю снимок: {cache_key}")
+        return df
+
+    def _cached(self, cache_key):
+        """
+        Запись из кэша. С планировщиком обновлений истёкшая запись тоже
+        отдаётся (stale-while-revalidate), а её обновление ставится в очередь.
+        """
+        if self.refresh_scheduler is None:
+            return self._cache.get(cache_key)
+
+        df = self._cache.get(cache_key, allow_stale=True)
+        if df is not None:
+            self.refresh_scheduler.touch(*cache_key)
+            if self._cache.is_stale(cache_key):
+                self.refresh_scheduler.request(*cache_key)
+        return df
+
+    def _watch(self, cache_key):
+        if self.refresh_scheduler is not None:
+            self.refresh_scheduler.register(*cache_key)
+
+    def _fetch_values(self, sheet_id, sheet_name):
+        def fetch():
+            with _STAGE_SECONDS.time("fetch"):
+                ws = self._google(self._open(sheet_id).worksheet, sheet_name)
+                return self._google(ws.get_all_values)
+        # Пользователи, открывшие лист одновременно, и фоновая проверка — один запрос
+        return self._flights.do(("values", sheet_id, sheet_name), fetch)
+
+    def _fetch_frame(self, cache_key):
+        """Значения листа из Google -> (DataFrame, метаданные для общего кэша)."""
+        values = self._fetch_values(*cache_key)
+        return self._build_frame(values), {"content_hash": self._content_hash(values)}
+
+    def _shared_frame(self, cache_key, revision=None, force=False):
+        """(DataFrame, хэш содержимого) через общий кэш воркеров или напрямую из Google."""
+        if self.shared_cache is None:
+            df, meta = self._fetch_frame(cache_key)
+        else:
+            df, meta = self.shared_cache.get_or_fill(
+                self._snapshot_key(*cache_key),
+                lambda: self._fetch_frame(cache_key),
+                revision=revision,
+                force=force,
+            )
+        return df, (meta or {}).get("content_hash")
+
+    def _modified_time(self, sheet_id):
+        """modifiedTime таблицы из Drive API; None, если недоступно."""
+        spreadsheet = self._open(sheet_id)
+        if not hasattr(spreadsheet, "get_lastUpdateTime"):
+            return None
+        try:
+            return self._google(spreadsheet.get_lastUpdateTime)
+        except Exception as e:
+            logger.info(f"[GSHEET LOADER] modifiedTime недоступен для {sheet_id}: {e}")
+            return None
+
+    def revalidate(self, sheet_id, sheet_name):
+        """
+        Проверить лист на изменения и при необходимости обновить кэш.
+
+        Сначала сверяется modifiedTime таблицы (дешёвый запрос метаданных);
+        если он тот же — значения не запрашиваются. Иначе значения сравниваются
+        по хэшу содержимого. Возвращает True, если данные изменились.
+        Лист, уже вытесненный из кэша, не перезагружается (это обошло бы
+        ограничение кэша и тратило квоту) — он снимается с наблюдения.
+        """
+        cache_key = (sheet_id, sheet_name)
+        cached = self._cache.get(cache_key, allow_stale=True)
+        if cached is None:
+            if self.refresh_scheduler is not None:
+                self.refresh_scheduler.unregister(*cache_key)
+            logger.info(f"[GSHEET LOADER] {cache_key} вытеснен из кэша, проверка пропущена")
+            return False
+
+        modified = self._modified_time(sheet_id)
+        if modified is not None and self._modified_times.get(cache_key) == modified:
+            self._cache.set(cache_key, cached)  # продлеваем жизнь записи
+            return False
+
+        # С общим кэшем новую ревизию из Google забирает только один воркер
+        df, content_hash = self._shared_frame(cache_key, revision=modified, force=modified is None)
+        if content_hash is not None and self._content_hashes.get(cache_key) == content_hash:
+            self._cache.set(cache_key, cached)
+            changed = False
+        else:
+            self._store(cache_key, df, content_hash=content_hash)
+            changed = True
+
+        if modified is not None:
+            self._modified_times[cache_key] = modified
+        logger.info(f"[GSHEET LOADER] Проверка {cache_key}: {'изменён' if changed else 'без изменений'}")
+        return changed
+
     def load(self, sheet_id, sheet_name, force_reload=False):
         cache_key = (sheet_id, sheet_name)
+        started = time.perf_counter()
 
         # Если кэш есть и не просим перезагрузить — возвращаем кэш
-        if not force_reload and cache_key in self._cache:
-            logger.info(f"[GSHEET LOADER] Возвращаю данные из кэша: {cache_key}")
-            return self._cache[cache_key]
+        if not force_reload:
+            df = self._cached(cache_key)
+            if df is not None:
+                logger.info(f"[GSHEET LOADER] Возвращаю данные из кэша: {cache_key}")
+                _LOAD_SECONDS.observe(time.perf_counter() - started, "memory")
+                return df
+
+            # После рестарта — свежий снимок с диска вместо похода в Google
+            df = self._load_snapshot(cache_key, max_age=self.snapshot_max_age)
+            if df is not None:
+                _LOAD_SECONDS.observe(time.perf_counter() - started, "snapshot")
+                return df
 
         # Иначе — грузим заново и обновляем кэш
         try:
-            creds = Credentials.from_service_account_file(
-                self.service_account_file, scopes=self.scopes
-            )
-            client = gspread.authorize(creds)
-            ws = client.open_by_key(sheet_id).worksheet(sheet_name)
-            values = ws.get_all_values()
+            df, content_hash = self._shared_frame(cache_key, force=force_reload)
 
-            if not values:
-                raise ValueError("Лист пуст")
+            # Обновляем кэш
+            self._store(cache_key, df, content_hash=content_hash)
+            self._watch(cache_key)
+            _LOAD_SECONDS.observe(time.perf_counter() - started, "google")
+            return df
 
-            first_row = [cell.strip() for cell in values[0]]
-            if "Модель" in first_row or "Показатель" in first_row:
-                header_row_index = 0
+        except Exception as e:
+            if _is_api_error(e):
+                logger.error(f"Google API ошибка: {e}")
             else:
-                header_row_index = 1
-
-            header = [h.strip() for h in values[header_row_index]]
-            data_rows = values[header_row_index + 1:]
-            df = pd.DataFrame(data_rows, columns=header)
-            df.columns = df.columns.str.strip()
+                logger.error(f"Ошибка загрузки данных: {e}")
+            df = self._offline_snapshot(cache_key)
+            if df is not None:
+                return df
+            raise
 
-            logger.info(
-                f"[GSHEET LOADER] Загружено: {df.shape}, "
-                f"header_row_index={header_row_index}"
-            )
+    @staticmethod
+    def _a1_sheet_range(sheet_name):
+        # Весь лист как A1-диапазон: 'Отчет 1' (апострофы внутри удваиваются)
+        return "'" + sheet_name.replace("'", "''") + "'"
 
-            # Обновляем кэш
-            self._cache[cache_key] = df
-            return df
+    @staticmethod
+    def _pad_rows(values):
+        # values.batchGet обрезает пустые хвосты строк, get_all_values — нет
+        width = max((len(row) for row in values), default=0)
+        return [row + [""] * (width - len(row)) for row in values]
 
-        except gspread.exceptions.APIError as e:
-            logger.error(f"Google API ошибка: {e}")
-            raise
+    def _fetch_batch(self, sheet_id, sheet_names):
+        """Один запрос values.batchGet на все листы; None, если не получилось."""
+        spreadsheet = self._open(sheet_id)
+        if not hasattr(spreadsheet, "values_batch_get"):
+            return None
+        try:
+            ranges = [self._a1_sheet_range(name) for name in sheet_names]
+            with _STAGE_SECONDS.time("fetch"):
+                response = self._flights.do(
+                    ("batch", sheet_id, tuple(sheet_names)),
+                    lambda: self._google(spreadsheet.values_batch_get, ranges),
+                )
         except Exception as e:
-            logger.error(f"Ошибка загрузки данных: {e}")
-            raise
+            if not _is_api_error(e):
+                raise
+            logger.warning(f"[GSHEET LOADER] batchGet не удался, грузим по листам: {e}")
+            return None
+
+        value_ranges = response.get("valueRanges", [])
+        if len(value_ranges) != len(sheet_names):
+            return None
+        return {
+            name: self._pad_rows(vr.get("values", []))
+            for name, vr in zip(sheet_names, value_ranges)
+        }
+
+    def _batch_frames(self, sheet_id, sheet_names, force_reload=False):
+        """
+        {лист: (DataFrame, хэш содержимого)} одним batchGet (через общий кэш
+        воркеров, если он есть); None — batchGet недоступен или не удался.
+        """
+        def fill_many(keys):
+            names = [keys_to_names[key] for key in keys]
+            try:
+                values_by_name = self._fetch_batch(sheet_id, names)
+            except Exception as e:
+                # Сеть/авторизация — пусть load() по каждому листу решит про снимки
+                logger.warning(f"[GSHEET LOADER] batchGet не удался: {e}")
+                values_by_name = None
+            if values_by_name is None:
+                raise _BatchUnavailable()
+            return {
+                key: (self._build_frame(values_by_name[name]),
+                      {"content_hash": self._content_hash(values_by_name[name])})
+                for key, name in zip(keys, names)
+            }
+
+        keys_to_names = {self._snapshot_key(sheet_id, name): name for name in sheet_names}
+        try:
+            if self.shared_cache is None:
+                filled = fill_many(list(keys_to_names))
+            elif force_reload:
+                filled = {
+                    key: self.shared_cache.put(key, df, extra=meta)
+                    for key, (df, meta) in fill_many(list(keys_to_names)).items()
+                }
+            else:
+                filled = self.shared_cache.get_or_fill_many(list(keys_to_names), fill_many)
+        except _BatchUnavailable:
+            return None
+        return {
+            keys_to_names[key]: (df, (meta or {}).get("content_hash"))
+            for key, (df, meta) in filled.items()
+        }
+
+    @metrics.timed(_LOAD_MANY_SECONDS)
+    def load_many(self, sheet_id, sheet_names, force_reload=False):
+        """
+        Загрузить несколько листов одной таблицы за один проход.
+
+        Промахи кэша забираются одним запросом values.batchGet; если он
+        недоступен — параллельно через ограниченный пул потоков.
+        Возвращает dict {sheet_name: DataFrame} в порядке sheet_names.
+        """
+        sheet_names = list(dict.fromkeys(name for name in sheet_names if name))
+        result = {}
+        missing = []
+        for name in sheet_names:
+            df = None
+            if not force_reload:
+                df = self._cached((sheet_id, name))
+                if df is None:
+                    df = self._load_snapshot((sheet_id, name), max_age=self.snapshot_max_age)
+            if df is None:
+                missing.append(name)
+            else:
+                result[name] = df
+
+        if missing:
+            frames = self._batch_frames(sheet_id, missing, force_reload)
+
+            if frames is not None:
+                for name in missing:
+                    df, content_hash = frames[name]
+                    self._store((sheet_id, name), df, content_hash=content_hash)
+                    self._watch((sheet_id, name))
+                    result[name] = df
+            else:
+                # Промахи уже проверены выше, но без force_reload load() заглянет
+                # в общий кэш воркеров — вдруг лист там уже есть
+                futures = {
+                    name: self._executor.submit(self.load, sheet_id, name, force_reload)
+                    for name in missing
+                }
+                for name, future in futures.items():
+                    result[name] = future.result()
+
+            logger.info(f"[GSHEET LOADER] Загружено листов: {len(missing)} из {sheet_names}")
+
+        return {name: result[name] for name in sheet_names}
+
+    def prefetch_reports(self, sheet_id, prefix="Отчет"):
+        """
+        В фоне подтянуть в кэш все листы «Отчет…» таблицы.
+        Возвращает Future; ошибки только логируются.
+        """
+        def _prefetch():
+            try:
+                names = [n for n in self.list_sheets(sheet_id) if n.startswith(prefix)]
+                self.load_many(sheet_id, names)
+                return names
+            except Exception as e:
+                logger.warning(f"[GSHEET LOADER] Ошибка предзагрузки {sheet_id}: {e}")
+                return []
+
+        return self._prefetch_executor.submit(_prefetch)
 
     def load_sheet(self, sheet_id, sheet_name, force_reload=False):
         """
@@ -90,7 +477,21 @@ class GoogleSheetsLoader:
         """
         return self.load(sheet_id, sheet_name, force_reload=force_reload)
 
+    def cache_stats(self):
+        """Счётчики кэша: hits / misses / evictions / expirations."""
+        return self._cache.stats()
+
+    def stats(self):
+        """Все счётчики лоадера: кэш, склейка запросов, лимит и повторы."""
+        return {
+            "cache": self._cache.stats(),
+            "single_flight": self._flights.stats(),
+            "rate_limit": self._rate_limiter.stats() if self._rate_limiter else None,
+            "backoff": self._backoff.stats(),
+            "shared": self.shared_cache.stats() if self.shared_cache else None,
+        }
+
     def clear_cache(self):
         """Очистить кэш загруженных данных"""
         self._cache.clear()
-        logger.info("[GSHEET LOADER] Кэш очищен")
\ No newline at end of file
+        logger.info("[GSHEET LOADER] Кэш очищен")
@@ -0,0 +1,202 @@
+import logging
+import re
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from core.matrix import MetricMatrix
+from core.metric_index import MetricIndex, normalize_name
+
+logger = logging.getLogger(__name__)
+
+_YEAR_RE = re.compile(r"(20\d{2})")
+
+
+def infer_year(sheet_title, default=None):
+    """Год отчёта из названия листа ("Отчет декабрь 2024"), иначе default / текущий."""
+    m = _YEAR_RE.search(str(sheet_title))
+    if m:
+        return int(m.group(1))
+    return default or date.today().year
+
+
+class LongStore:
+    """
+    Колоночное хранилище всех листов «Отчет…» в длинном формате (metric, date, value).
+
+    Каждый лист — один месяц в широком виде; при ingest он разворачивается
+    в три массива: коды показателей (общий словарь категорий), даты и значения.
+    Общие массивы отсортированы по дате, так что любой диапазон дат — в том числе
+    через границы месяцев — берётся двумя бинарными поисками.
+    Повторная загрузка листа заменяет его данные; на совпадающих (показатель, дата)
+    побеждает лист, загруженный позже.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self._codes = {}
+        self._chunks = {}
+        self._order = []
+        self._lock = threading.RLock()
+        self._consolidated = None
+        self._index = None
+
+    def _code(self, label):
+        # "ВХОДЯЩИЕ ЗВОНКИ - ВЗ" и "Входящие звонки - ВЗ" из разных месяцев — один код
+        key = normalize_name(label)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.categories)
+            self._codes[key] = code
+            self.categories.append(label)
+        return code
+
+    def ingest(self, sheet_title, df, year=None, matrix=None):
+        """Развернуть лист в длинный формат. Колонки, не похожие на даты, пропускаются."""
+        if matrix is None:
+            matrix = MetricMatrix.from_frame(df, year=infer_year(sheet_title, year))
+        day_pos = matrix.day_positions
+        values = matrix.values[:, day_pos]
+
+        # Строки без названия показателя (разделители, пустые) не храним
+        labelled = np.array([i for i, label in enumerate(matrix.labels) if label], dtype=np.intp)
+        values = values[labelled]
+
+        with self._lock:
+            row_codes = np.array([self._code(matrix.labels[i]) for i in labelled], dtype=np.int32)
+            rows, cols = np.nonzero(~np.isnan(values))
+
+            self._chunks[sheet_title] = (
+                row_codes[rows],
+                matrix.dates[day_pos].values[cols].astype("datetime64[D]"),
+                values[rows, cols],
+            )
+            if sheet_title in self._order:
+                self._order.remove(sheet_title)
+            self._order.append(sheet_title)
+            self._consolidated = None
+            self._index = None
+
+        logger.info(f"[LONG STORE] Лист '{sheet_title}': {len(rows)} значений")
+
+    def ingest_many(self, frames, year=None):
+        """frames: {название листа: DataFrame}, например результат loader.load_many()."""
+        for title, df in frames.items():
+            self.ingest(title, df, year=year)
+
+    @classmethod
+    def from_loader(cls, loader, sheet_id, prefix="Отчет", year=None):
+        """Собрать хранилище из всех листов «Отчет…» таблицы одним batch-запросом."""
+        store = cls()
+        names = [n for n in loader.list_sheets(sheet_id) if n.startswith(prefix)]
+        store.ingest_many(loader.load_many(sheet_id, names), year=year)
+        return store
+
+    def _arrays(self):
+        with self._lock:
+            if self._consolidated is None:
+                if not self._order:
+                    empty = (np.array([], dtype=np.int32), np.array([], dtype="datetime64[D]"),
+                             np.array([], dtype=np.float64))
+                    self._consolidated = empty
+                    return empty
+                codes = np.concatenate([self._chunks[t][0] for t in self._order])
+                dates = np.concatenate([self._chunks[t][1] for t in self._order])
+                values = np.concatenate([self._chunks[t][2] for t in self._order])
+
+                # Сортировка по (дата, показатель); при дублях оставляем последний лист
+                order = np.lexsort((np.arange(len(codes)), codes, dates))
+                codes, dates, values = codes[order], dates[order], values[order]
+                keep = np.ones(len(codes), dtype=bool)
+                keep[:-1] = (codes[:-1] != codes[1:]) | (dates[:-1] != dates[1:])
+                self._consolidated = (codes[keep], dates[keep], values[keep])
+            return self._consolidated
+
+    @property
+    def index(self):
+        """Поиск показателя по названию с учётом алиасов (см. MetricIndex)."""
+        with self._lock:
+            if self._index is None:
+                self._index = MetricIndex(self.categories)
+            return self._index
+
+    @property
+    def date_range(self):
+        _, dates, _ = self._arrays()
+        if not len(dates):
+            return None, None
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def _codes_for(self, metrics):
+        codes = []
+        for name in metrics:
+            code = self.index.lookup(name)
+            if code is None:
+                logger.warning(f"[LONG STORE] Показатель не найден: {name}")
+            else:
+                codes.append(code)
+        return np.array(codes, dtype=np.int32)
+
+    def query(self, start=None, end=None, metrics=None):
+        """
+        Длинный DataFrame (Показатель, Дата, Значение) за [start, end] включительно.
+        metrics — список названий; None — все показатели.
+        """
+        codes, dates, values = self._arrays()
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date()), "left")
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date()), "right")
+        codes, dates, values = codes[lo:hi], dates[lo:hi], values[lo:hi]
+
+        if metrics is not None:
+            mask = np.isin(codes, self._codes_for(metrics))
+            codes, dates, values = codes[mask], dates[mask], values[mask]
+
+        return pd.DataFrame({
+            "Показатель": pd.Categorical.from_codes(codes, categories=self.categories),
+            "Дата": dates.astype("datetime64[ns]"),
+            "Значение": values,
+        })
+
+    def series(self, start=None, end=None, metrics=None, freq="D"):
+        """Широкая таблица дата × показатель; дни без данных — 0. freq "W"/"MS" — суммы по неделям/месяцам."""
+        long = self.query(start, end, metrics)
+        wide = long.pivot_table(index="Дата", columns="Показатель", values="Значение",
+                                aggfunc="sum", observed=True)
+        if wide.empty:
+            return wide
+        full = pd.date_range(wide.index.min(), wide.index.max(), freq="D")
+        wide = wide.reindex(full, fill_value=0).fillna(0)
+        wide.index.name = "Дата"
+        return wide if freq == "D" else wide.resample(freq).sum()
+
+    def totals(self, start=None, end=None, metrics=None):
+        """Суммы по показателям за период — одна группировка по кодам."""
+        long = self.query(start, end, metrics)
+        codes = long["Показатель"].cat.codes.to_numpy()
+        sums = np.bincount(codes, weights=long["Значение"].to_numpy(), minlength=len(self.categories))
+        result = pd.Series(sums, index=self.categories, name="Сумма за период")
+        if metrics is not None:
+            result = result.iloc[self._codes_for(metrics)]
+        return result
+
+    def rolling(self, metrics, window=7, start=None, end=None):
+        """Скользящая сумма за window дней по дневному ряду."""
+        return self.series(start, end, metrics).rolling(window, min_periods=1).sum()
+
+    def year_over_year(self, start, end, metrics=None):
+        """Суммы за период и за тот же период годом раньше, с абсолютной и % разницей."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        current = self.totals(start, end, metrics)
+        previous = self.totals(start - pd.DateOffset(years=1), end - pd.DateOffset(years=1), metrics)
+        result = pd.DataFrame({"Текущий": current, "Год назад": previous})
+        result["Разница"] = result["Текущий"] - result["Год назад"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result["Разница, %"] = np.where(
+                result["Год назад"] != 0, result["Разница"] / result["Год назад"] * 100, np.nan
+            )
+        return result
+
+    def __len__(self):
+        return len(self._arrays()[0])
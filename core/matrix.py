@@ -0,0 +1,170 @@
+import itertools
+import logging
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from core.metric_index import MetricIndex
+
+logger = logging.getLogger(__name__)
+
+# Всё, что мешает числу: пробелы (включая неразрывные) и знак процента
+_NUMBER_JUNK_RE = "[\\s\u00a0\u202f%]"
+_DAY_MONTH_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})$")
+# Номера матриц в процессе: по ним Rollup.update узнаёт, от какой матрицы changes
+_serials = itertools.count()
+
+
+def parse_numbers(values):
+    """
+    Векторно привести сырые значения листа к float64.
+    Понимает запятую как десятичный разделитель, пробелы-разделители тысяч
+    и проценты ("12,5%" -> 12.5). Всё нераспознанное — NaN.
+    """
+    s = pd.Series(np.asarray(values, dtype=object).ravel(), dtype=object)
+    num = pd.to_numeric(s, errors="coerce")
+
+    # Быстрый путь не справился — чистим только проблемные ячейки
+    need = num.isna() & s.notna()
+    if need.any():
+        cleaned = (
+            s[need].astype(str)
+            .str.replace(_NUMBER_JUNK_RE, "", regex=True)
+            .str.replace(",", ".", regex=False)
+        )
+        num[need] = pd.to_numeric(cleaned, errors="coerce")
+
+    return num.to_numpy(dtype=np.float64)
+
+
+def parse_column_date(col, year=None):
+    """Дата колонки-дня: Timestamp из Excel или строка "01.12" / "2024-12-01"; иначе NaT."""
+    if isinstance(col, (pd.Timestamp, date)):
+        return pd.Timestamp(col).normalize()
+    text = str(col).strip()
+    m = _DAY_MONTH_RE.match(text)
+    if m:
+        day, month = int(m.group(1)), int(m.group(2))
+        try:
+            return pd.Timestamp(year=year or date.today().year, month=month, day=day)
+        except ValueError:
+            return pd.NaT
+    dt = pd.to_datetime(text, errors="coerce", dayfirst=True)
+    return dt.normalize() if pd.notna(dt) else pd.NaT
+
+
+class MetricMatrix:
+    """
+    Нормализованное представление листа, которое строится один раз на загрузку:
+
+    - values: непрерывная float64-матрица показатели × колонки данных (NaN — пусто);
+    - index: MetricIndex "Показатель" -> номер строки (с учётом алиасов);
+    - columns / dates: исходные колонки данных и разобранная ось дат (NaT, если не дата).
+
+    Колонки данных — всё после первых двух (как в DataProcessor).
+    values и prefix могут быть read-only memmap из общего кэша (core/shared_cache.py).
+
+    changes — (serial прошлой матрицы, позиции колонок, разобранных заново) для
+    матрицы, построенной из прошлой версии (from_frame с previous), иначе None.
+    """
+
+    def __init__(self, labels, columns, values, dates, prefix=None):
+        self.labels = labels
+        self.columns = columns
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.dates = dates
+        self._prefix = prefix
+        self.index = MetricIndex(labels)
+        self.serial = next(_serials)
+        self.changes = None
+
+    @classmethod
+    def from_frame(cls, df, label_col="Показатель", first_data_col=2, year=None, previous=None):
+        """
+        previous — (кадр, матрица) прошлой версии того же листа. Колонки, чьи сырые
+        ячейки не изменились, берутся из неё уже разобранными; заново разбираются
+        только изменённые и дописанные (разбор — самая дорогая часть загрузки).
+        """
+        if label_col in df.columns:
+            labels = df[label_col].fillna("").astype(str).str.strip().tolist()
+        else:
+            labels = [""] * len(df)
+
+        columns = df.columns[first_data_col:].tolist()
+        reused = cls._unchanged_columns(df, labels, columns, first_data_col, previous)
+        parse = [j for j in range(len(columns)) if j not in reused]
+
+        values = np.empty((len(df), len(columns)), dtype=np.float64)
+        if reused:
+            values[:, list(reused)] = previous[1].values[:, list(reused.values())]
+        if parse:
+            block = df.iloc[:, [first_data_col + j for j in parse]].to_numpy(dtype=object)
+            values[:, parse] = parse_numbers(block).reshape(block.shape)
+        dates = pd.DatetimeIndex([parse_column_date(c, year) for c in columns])
+
+        logger.info(f"[MATRIX] Построена матрица {values.shape}, разобрано колонок: {len(parse)}")
+        matrix = cls(labels, columns, values, dates)
+        if previous is not None:
+            matrix.changes = (previous[1].serial, np.array(parse, dtype=np.intp))
+        return matrix
+
+    @staticmethod
+    def _unchanged_columns(df, labels, columns, first_data_col, previous):
+        """{позиция колонки: позиция в прошлой матрице} для колонок с теми же сырыми ячейками."""
+        if previous is None:
+            return {}
+        prev_df, prev_matrix = previous
+        # Строки вставлены/удалены/переименованы — значения не совпадут по позициям
+        if prev_matrix.labels != labels or len(prev_df) != len(df):
+            return {}
+
+        prev_first = len(prev_df.columns) - len(prev_matrix.columns)
+        counts = pd.Index(prev_matrix.columns).value_counts()
+        prev_pos = {c: i for i, c in enumerate(prev_matrix.columns) if counts[c] == 1}
+        # Сравниваем массивы колонок напрямую: df.iloc[:, j] на каждую колонку
+        # строит Series и стоит дороже самого сравнения
+        new_arrays = [s.array for _, s in df.items()]
+        prev_arrays = [s.array for _, s in prev_df.items()]
+        reused = {}
+        for j, col in enumerate(columns):
+            i = prev_pos.get(col)
+            if i is not None and new_arrays[first_data_col + j].equals(prev_arrays[prev_first + i]):
+                reused[j] = i
+        return reused
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def day_positions(self):
+        """Позиции колонок, которые удалось разобрать как даты."""
+        return np.flatnonzero(~self.dates.isna())
+
+    def row(self, label):
+        """Строка показателя (view на матрицу) или None."""
+        i = self.index.lookup(label)
+        return None if i is None else self.values[i]
+
+    @property
+    def prefix(self):
+        """
+        Накопленные суммы по колонкам с нулевой колонкой слева (NaN = 0):
+        сумма колонок [a, b) = prefix[:, b] - prefix[:, a].
+        """
+        if self._prefix is None:
+            n_rows, n_cols = self.values.shape
+            prefix = np.zeros((n_rows, n_cols + 1), dtype=np.float64)
+            np.cumsum(np.nan_to_num(self.values, nan=0.0), axis=1, out=prefix[:, 1:])
+            self._prefix = prefix
+        return self._prefix
+
+    def range_sum(self, start, end):
+        """Суммы всех показателей по колонкам [start, end) — одно векторное вычитание."""
+        start = max(0, start)
+        end = min(self.values.shape[1], end)
+        if end <= start:
+            return np.zeros(self.values.shape[0], dtype=np.float64)
+        return self.prefix[:, end] - self.prefix[:, start]
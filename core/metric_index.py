@@ -0,0 +1,112 @@
+import logging
+import re
+import weakref
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_DASHES_RE = re.compile(r"\s*[-‐‑‒–—]\s*")
+_SPACES_RE = re.compile(r"\s+")
+
+# Индексы, привязанные к кадрам: id(df) -> MetricIndex, пока кадр жив.
+# Не в df.attrs: pandas глубоко копирует attrs при каждой операции над кадром
+_frame_indexes = {}
+
+
+def normalize_name(name):
+    """Привести название показателя к ключу поиска: регистр, ё, тире, пробелы."""
+    text = str(name).casefold().replace("ё", "е")
+    text = _DASHES_RE.sub(" - ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class MetricIndex:
+    """
+    Индекс строк "Показатель" -> номер строки, строится один раз на загрузку.
+
+    Порядок поиска:
+    1) точное совпадение нормализованного названия;
+    2) синонимы из таблицы алиасов (Config.METRIC_ALIASES);
+    3) вхождение запроса целыми словами — только если подходит ровно одна строка.
+
+    Каждый запрос разрешается не более чем в одну строку; результаты запоминаются.
+    """
+
+    def __init__(self, labels, aliases=None):
+        self.labels = list(labels)
+        self.exact = {}
+        duplicates = set()
+        for i, label in enumerate(self.labels):
+            key = normalize_name(label)
+            if not key:
+                continue
+            if key in self.exact:
+                duplicates.add(key)
+                continue
+            self.exact[key] = i
+        if duplicates:
+            logger.warning(f"[METRIC INDEX] Повторяющиеся показатели, берём первую строку: {sorted(duplicates)}")
+
+        # Группа синонимов: любое название из группы -> все названия группы
+        self._aliases = {}
+        alias_table = Config.METRIC_ALIASES if aliases is None else aliases
+        for canonical, alternatives in alias_table.items():
+            group = [normalize_name(canonical)] + [normalize_name(a) for a in alternatives]
+            for name in group:
+                self._aliases.setdefault(name, []).extend(n for n in group if n != name)
+
+        self._memo = {}
+
+    def lookup(self, name):
+        """Номер строки показателя или None, если не найден или неоднозначен."""
+        key = normalize_name(name)
+        if key in self._memo:
+            return self._memo[key]
+
+        row = self.exact.get(key)
+        if row is None:
+            for alias in self._aliases.get(key, ()):
+                row = self.exact.get(alias)
+                if row is not None:
+                    break
+        if row is None and key:
+            row = self._unique_word_match(key)
+
+        self._memo[key] = row
+        return row
+
+    def _unique_word_match(self, key):
+        pattern = re.compile(r"(?<!\w)" + re.escape(key) + r"(?!\w)")
+        matches = [i for k, i in self.exact.items() if pattern.search(k)]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            logger.warning(
+                f"[METRIC INDEX] Неоднозначный показатель '{key}': "
+                f"{[self.labels[i] for i in matches]}"
+            )
+        return None
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __len__(self):
+        return len(self.exact)
+
+
+def attach_index(df, index):
+    """Привязать готовый индекс к кадру, строки которого идут в порядке index.labels."""
+    key = id(df)
+    if key not in _frame_indexes:
+        weakref.finalize(df, _frame_indexes.pop, key, None)
+    _frame_indexes[key] = index
+    return index
+
+
+def frame_index(df):
+    """Индекс кадра с колонкой "Показатель": привязанный или построенный один раз на кадр."""
+    index = _frame_indexes.get(id(df))
+    if index is None:
+        index = attach_index(df, MetricIndex(df["Показатель"].fillna("").astype(str)))
+    return index
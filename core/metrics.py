@@ -0,0 +1,254 @@
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Стандартные границы Prometheus для задержек (сек) и степени 4 для размеров (байт)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))  # 1 КБ .. 16 МБ
+
+# Выключатель всей инструментации. Выключенные метрики ничего не считают:
+# observe/inc сразу возвращаются, timer() отдаёт общий пустой контекст
+enabled = Config.METRICS_ENABLED
+_NULL_TIMER = nullcontext()
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _register(metric):
+    # Повторная регистрация (перезагрузка модуля) возвращает существующую метрику
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+class Histogram:
+    """Гистограмма Prometheus: накопительные бакеты, _sum и _count по значениям меток."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not enabled:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """Контекстный менеджер: время блока в секундах."""
+        if not enabled:
+            return _NULL_TIMER
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total, count)
+                     for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(items):
+            cumulative = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                yield "_bucket", labels, (("le", _format_value(le)),), cumulative
+            yield "_sum", labels, (), total
+            yield "_count", labels, (), count
+
+
+class Counter:
+    """Монотонный счётчик по значениям меток."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield "", labels, (), value
+
+
+class CallbackGauge:
+    """Gauge, значения которого снимаются при каждом запросе /metrics: fn() -> [(метки, значение)]."""
+
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames, fn):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def samples(self):
+        try:
+            items = list(self.fn())
+        except Exception as e:
+            logger.warning(f"[METRICS] Не удалось снять {self.name}: {e}")
+            return
+        for labels, value in items:
+            if value is not None:
+                yield "", tuple(labels), (), value
+
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter(name, help, labelnames))
+
+
+def gauge_callback(name, help, labelnames, fn):
+    """Gauge из функции; повторная регистрация заменяет функцию."""
+    gauge = _register(CallbackGauge(name, help, labelnames, fn))
+    gauge.fn = fn
+    return gauge
+
+
+def timed(metric, *labels):
+    """Декоратор: время вызова функции в гистограмму metric."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - started, *labels)
+        return wrapper
+    return decorator
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for suffix, labels, extra, value in metric.samples():
+            label_str = _format_labels(metric.labelnames, labels, extra)
+            lines.append(f"{metric.name}{suffix}{label_str} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Метрики Dash-коллбеков: снимаются в хуках Flask вокруг /_dash-update-component,
+# поэтому покрывают весь запрос — сам коллбек и сериализацию ответа в JSON
+CALLBACK_SECONDS = histogram(
+    "dash_callback_seconds", "Время обработки Dash-коллбека, сек", ["callback"])
+CALLBACK_RESPONSE_BYTES = histogram(
+    "dash_callback_response_bytes", "Размер JSON-ответа Dash-коллбека, байт", ["callback"],
+    buckets=SIZE_BUCKETS)
+CALLBACK_ERRORS = counter(
+    "dash_callback_errors_total", "Ошибки в Dash-коллбеках", ["callback"])
+
+
+def install(app, path="/metrics"):
+    """
+    Подключить метрики к Dash-приложению: маршрут path на app.server
+    и замеры всех коллбеков. При выключенных метриках ничего не подключается.
+
+    Метрики свои у каждого процесса: под gunicorn с несколькими воркерами
+    Prometheus видит тот воркер, который ответил на запрос.
+    """
+    if not enabled:
+        logger.info("[METRICS] Метрики отключены")
+        return
+
+    import flask
+
+    server = app.server
+    update_path = app.config.routes_pathname_prefix + "_dash-update-component"
+
+    def callback_name():
+        body = flask.request.get_json(silent=True) or {}
+        output = body.get("output", "")
+        callback = app.callback_map.get(output, {}).get("callback")
+        return getattr(callback, "__name__", output)
+
+    @server.before_request
+    def _start_timer():
+        if flask.request.path == update_path:
+            flask.g.metrics_started = time.perf_counter()
+
+    @server.after_request
+    def _observe_callback(response):
+        started = flask.g.pop("metrics_started", None)
+        if started is None:
+            return response
+        name = callback_name()
+        CALLBACK_SECONDS.observe(time.perf_counter() - started, name)
+        if not response.is_streamed:
+            CALLBACK_RESPONSE_BYTES.observe(response.calculate_content_length() or 0, name)
+        if response.status_code >= 500:
+            CALLBACK_ERRORS.inc(name)
+        return response
+
+    @server.route(path)
+    def _metrics():
+        return flask.Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    logger.info(f"[METRICS] Метрики доступны на {path}")
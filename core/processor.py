@@ -1,17 +1,32 @@
 import logging
+from functools import lru_cache
+import numpy as np
 import pandas as pd
+from core import metrics
 from core.loaders.excel_loader import ExcelLoader
+from core.dimensions import DimensionTable
+from core.matrix import MetricMatrix
+from core.metric_index import attach_index
+from core.reasons import ReasonsBlock
 
 logger = logging.getLogger(__name__)
 
+_PROCESS_SECONDS = metrics.histogram(
+    "process_data_seconds", "DataProcessor.process_data, сек")
+
 class DataProcessor:
-    def __init__(self, excel_path=None):
+    def __init__(self, excel_path=None, snapshot_cache=None):
         self.excel_path = excel_path
+        self.snapshot_cache = snapshot_cache
         self.df = None
         self.data_columns = []
         self.max_day = 0
         self.target_sheet_name = None
         self.data_source = 'excel'
+        self.matrix = None
+        self._reasons = None
+        self._dimensions = None
+        self._col_positions = {}
         self._cached_agg_data = None
 
         # Загружаем Excel по умолчанию
@@ -20,12 +35,14 @@ class DataProcessor:
 
     def _load_from_excel(self):
         try:
-            loader = ExcelLoader(self.excel_path)
+            loader = ExcelLoader(self.excel_path, snapshot_cache=self.snapshot_cache)
             self.df = loader.load(self.target_sheet_name)
 
             self.data_columns = self.df.columns[2:].tolist()
             self.max_day = len(self.data_columns)
             self.data_source = 'excel'
+            self.matrix = MetricMatrix.from_frame(self.df)
+            self._index_columns()
 
             logger.info(f"[EXCEL] Загружено: {self.df.shape[0]} строк, {self.max_day} дней")
         except Exception as e:
@@ -33,39 +50,76 @@ class DataProcessor:
             self.df = pd.DataFrame(columns=['Показатель'] + [f'День {i}' for i in range(1, 6)])
             self.data_columns = self.df.columns[1:].tolist()
             self.max_day = len(self.data_columns)
+            self.matrix = MetricMatrix.from_frame(self.df, first_data_col=1)
+            self._index_columns()
 
-    def load_from_gsheet(self, df, sheet_name):
+    def load_from_gsheet(self, df, sheet_name, matrix=None):
         """Загрузка данных из Google Sheets"""
+        self._set_frame(df, sheet_name, 'gsheet', matrix=matrix)
+
+    def load_from_source(self, source, sheet_name=None):
+        """Загрузка листа из любого источника core.sources (Excel, Google Sheets, CSV/Parquet)"""
+        sheet_name = sheet_name or source.default_sheet()
+        self._set_frame(source.load(sheet_name), sheet_name, source.kind)
+
+    def _set_frame(self, df, sheet_name, kind, matrix=None):
         try:
             self.df = df
             self.target_sheet_name = sheet_name
-            self.data_source = 'gsheet'
+            self.data_source = kind
 
             self.data_columns = self.df.columns[2:].tolist()
             self.max_day = len(self.data_columns)
+            self.matrix = matrix if matrix is not None else MetricMatrix.from_frame(self.df)
+            self._index_columns()
 
-            logger.info(f"[GSHEET] Загружено: {self.df.shape[0]} строк, {self.max_day} дней — Лист: {sheet_name}")
+            logger.info(f"[{kind.upper()}] Загружено: {self.df.shape[0]} строк, {self.max_day} дней — Лист: {sheet_name}")
         except Exception as e:
-            logger.error(f"[GSHEET] Ошибка: {e}")
+            logger.error(f"[{kind.upper()}] Ошибка: {e}")
             raise
 
-    def process_data(self, day_range):
+    def _index_columns(self):
+        """Нормализованная дата -> позиция колонки; считается один раз на загрузку."""
+        self._reasons = None
+        self._dimensions = None
+        self._normalized_columns = [self.normalize_date(col) for col in self.data_columns]
+        self._col_positions = {norm: i for i, norm in enumerate(self._normalized_columns)}
+
+    @metrics.timed(_PROCESS_SECONDS)
+    def process_data(self, day_range, include_raw=True):
+        """
+        Суммы показателей за дни [start_day, end_day] (нумерация с 1).
+        include_raw=False не собирает сырой срез колонок (первый элемент — None):
+        его сборка растёт с числом дней, а для графиков он не нужен.
+        """
         try:
             start_day, end_day = day_range
-            day_cols = self.data_columns[start_day - 1:end_day]
-
-            normalized_day_cols = [self.normalize_date(col) for col in day_cols]
-            col_mapping = {self.normalize_date(col): col for col in self.df.columns[2:]}
-            selected_cols = [col_mapping[col] for col in normalized_day_cols if col in col_mapping]
-
-            if not selected_cols:
+            start, end = max(start_day - 1, 0), min(end_day, len(self.data_columns))
+
+            positions = [
+                self._col_positions[norm]
+                for norm in self._normalized_columns[start:end]
+                if norm in self._col_positions
+            ]
+            if not positions:
                 return pd.DataFrame(), pd.DataFrame()
 
-            data_period = self.df[['Показатель'] + selected_cols].copy()
-            num_data = data_period[selected_cols].apply(pd.to_numeric, errors='coerce').fillna(0)
+            data_period = None
+            if include_raw:
+                selected_cols = [self.data_columns[i] for i in positions]
+                data_period = self.df[['Показатель'] + selected_cols]
+
+            # Числа уже разобраны при загрузке. Сплошной диапазон дней —
+            # одно вычитание накопленных сумм, иначе (дубли дат) — сумма по позициям
+            if positions == list(range(start, end)):
+                totals = self.matrix.range_sum(start, end)
+            else:
+                totals = np.nansum(self.matrix.values[:, positions], axis=1)
 
-            data_period_aggregated = data_period[['Показатель']].copy()
-            data_period_aggregated['Сумма за период'] = num_data.sum(axis=1)
+            data_period_aggregated = self.df[['Показатель']].copy()
+            data_period_aggregated['Сумма за период'] = totals
+            # Строки агрегата идут в том же порядке, что и в матрице
+            attach_index(data_period_aggregated, self.matrix.index)
 
             self._cached_agg_data = data_period_aggregated
             return data_period, data_period_aggregated
@@ -73,6 +127,32 @@ class DataProcessor:
             logger.error(f"Ошибка обработки данных: {e}")
             return pd.DataFrame(), pd.DataFrame()
 
+    @property
+    def reasons(self):
+        """Блок причин (ReasonsBlock) — выделяется из матрицы один раз на загрузку."""
+        if self._reasons is None:
+            self._reasons = ReasonsBlock.from_matrix(self.matrix)
+        return self._reasons
+
+    def top_reasons(self, day_range, n=None):
+        """Топ-n причин за дни [start_day, end_day] (нумерация с 1), см. ReasonsBlock.top."""
+        start_day, end_day = day_range
+        return self.reasons.top(max(start_day - 1, 0), min(end_day, len(self.data_columns)), n)
+
+    @property
+    def dimensions(self):
+        """Строки сотрудников и других сущностей (DimensionTable) — один раз на загрузку."""
+        if self._dimensions is None:
+            self._dimensions = DimensionTable.detect(self.matrix)
+        return self._dimensions
+
+    def dimension_totals(self, dimension, day_range, top_k=None):
+        """Суммы по сущностям измерения за дни [start_day, end_day], см. DimensionTable.totals."""
+        start_day, end_day = day_range
+        return self.dimensions.totals(
+            self.matrix, max(start_day - 1, 0), min(end_day, len(self.data_columns)), dimension, top_k=top_k
+        )
+
     def find_metric_value(self, df_hash, metric_name_part):
         if self.df.empty or 'Показатель' not in self.df.columns:
             return 0
@@ -81,24 +161,35 @@ class DataProcessor:
             if agg_data is None:
                 return 0
 
-            match = agg_data[agg_data['Показатель'].str.contains(
-                metric_name_part, na=False, case=False)]
-
-            if not match.empty:
-                return pd.to_numeric(match['Сумма за период'].iloc[0], errors='coerce') or 0
+            row = self.matrix.index.lookup(metric_name_part)
+            if row is not None:
+                return float(agg_data['Сумма за период'].iat[row]) or 0
         except Exception as e:
             logger.warning(f"Ошибка поиска метрики '{metric_name_part}': {e}")
         return 0
 
     @staticmethod
     def normalize_date(col):
+        # Разбор даты дорогой, а названия колонок повторяются от листа к листу
         try:
-            if isinstance(col, pd.Timestamp):
-                return col.strftime('%Y-%m-%d')
-            if isinstance(col, str):
-                dt = pd.to_datetime(col, errors='coerce')
-                if pd.notna(dt):
-                    return dt.strftime('%Y-%m-%d')
-            return str(col)
-        except Exception:
-            return str(col)
+            return _normalize_date_cached(col)
+        except TypeError:  # нехешируемое название колонки
+            return _normalize_date(col)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_date_cached(col):
+    return _normalize_date(col)
+
+
+def _normalize_date(col):
+    try:
+        if isinstance(col, pd.Timestamp):
+            return col.strftime('%Y-%m-%d')
+        if isinstance(col, str):
+            dt = pd.to_datetime(col, errors='coerce')
+            if pd.notna(dt):
+                return dt.strftime('%Y-%m-%d')
+        return str(col)
+    except Exception:
+        return str(col)
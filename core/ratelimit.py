@@ -0,0 +1,125 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Клиентский лимит запросов: rate токенов в секунду, запас до capacity.
+    acquire() ждёт, пока появится токен; delayed / delayed_seconds — сколько
+    запросов пришлось придержать и на сколько.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.delayed_seconds = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Взять токен; возвращает, сколько секунд пришлось ждать."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    if waited:
+                        self.delayed += 1
+                        self.delayed_seconds += waited
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def stats(self):
+        return {
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "delayed_seconds": round(self.delayed_seconds, 3),
+        }
+
+
+def is_quota_error(error):
+    """429 / RESOURCE_EXHAUSTED от Google API (и 503 — временная перегрузка)."""
+    code = getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    if code is None and response is not None:
+        code = getattr(response, "status_code", None)
+    if code in (429, 503):
+        return True
+    text = str(error)
+    return "RESOURCE_EXHAUSTED" in text or "Quota exceeded" in text or "rateLimitExceeded" in text
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Backoff:
+    """
+    Повтор вызова при ошибках квоты: экспоненциальная задержка с полным
+    джиттером (base * 2^n, не больше cap), Retry-After из ответа — приоритетнее.
+    """
+
+    def __init__(self, retries=5, base=1.0, cap=32.0, retry_on=is_quota_error,
+                 sleep=time.sleep, rng=None):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.retry_on = retry_on
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.retried = 0
+        self.gave_up = 0
+        self.slept_seconds = 0.0
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.retry_on(e):
+                    raise
+                if attempt >= self.retries:
+                    with self._lock:
+                        self.gave_up += 1
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = self._rng.uniform(0, min(self.cap, self.base * 2 ** attempt))
+                with self._lock:
+                    self.retried += 1
+                    self.slept_seconds += delay
+                logger.warning(f"[BACKOFF] Квота Google, повтор через {delay:.1f} с: {e}")
+                self._sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        return {
+            "retried": self.retried,
+            "gave_up": self.gave_up,
+            "slept_seconds": round(self.slept_seconds, 3),
+        }
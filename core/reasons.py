@@ -0,0 +1,64 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ReasonsBlock:
+    """
+    Блок причин отчёта: строки листа начиная с Config.REASONS_START_ROW
+    (позиция строки в DataFrame, с 0) и до конца листа; строки без названия
+    пропускаются.
+
+    Строится один раз на загрузку из MetricMatrix: берутся готовые накопленные
+    суммы нужных строк, поэтому сумма за любой период — одно вычитание,
+    а топ-N выбирается через np.argpartition без полной сортировки.
+    """
+
+    def __init__(self, labels, prefix):
+        self.labels = np.asarray(labels, dtype=object)
+        self.prefix = prefix
+
+    @classmethod
+    def from_matrix(cls, matrix, start_row=None):
+        start_row = Config.REASONS_START_ROW if start_row is None else start_row
+        rows = [i for i in range(start_row, len(matrix.labels)) if matrix.labels[i]]
+        labels = [matrix.labels[i] for i in rows]
+        prefix = matrix.prefix[rows] if rows else np.zeros((0, matrix.shape[1] + 1))
+        logger.info(f"[REASONS] Блок причин: {len(rows)} строк с {start_row}-й")
+        return cls(labels, prefix)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def range_sums(self, start, end):
+        """Суммы всех причин по колонкам [start, end)."""
+        n_cols = self.prefix.shape[1] - 1
+        start, end = max(0, start), min(n_cols, end)
+        if end <= start:
+            return np.zeros(len(self.labels), dtype=np.float64)
+        return self.prefix[:, end] - self.prefix[:, start]
+
+    def top(self, start, end, n=None):
+        """
+        DataFrame (Причина, Количество) — n самых частых причин за колонки [start, end),
+        по убыванию; причины с нулём не показываются. При равенстве — порядок в листе.
+        """
+        n = Config.MAX_REASONS_DISPLAY if n is None else n
+        sums = self.range_sums(start, end)
+        k = min(n, len(sums))
+        if k <= 0:
+            return pd.DataFrame({"Причина": [], "Количество": []})
+
+        if k < len(sums):
+            picked = np.argpartition(-sums, k - 1)[:k]
+        else:
+            picked = np.arange(len(sums))
+        picked = picked[np.lexsort((picked, -sums[picked]))]
+        picked = picked[sums[picked] > 0]
+
+        return pd.DataFrame({"Причина": self.labels[picked], "Количество": sums[picked]})
@@ -0,0 +1,170 @@
+import heapq
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """
+    Фоновое обновление листов Google Sheets (stale-while-revalidate).
+
+    Каждый зарегистрированный лист проверяется раз в свой интервал
+    (по умолчанию default_interval) со случайным сдвигом ±jitter, чтобы
+    воркеры и листы не ходили в Google одновременно. Сама проверка —
+    loader.revalidate(): modifiedTime таблицы, затем хэш содержимого.
+    Коллбеки в это время получают кэшированную копию без ожидания.
+
+    Листы, к которым не обращались дольше idle_after секунд, снимаются
+    с наблюдения (лоадер отмечает обращения через touch()): иначе каждый когда-либо
+    открытый лист опрашивался бы вечно. Лист, вытесненный из кэша лоадера,
+    снимает сам revalidate().
+
+    Поток запускается при первой регистрации листа — уже внутри воркера,
+    а не в мастер-процессе gunicorn.
+    """
+
+    def __init__(self, loader, default_interval=120.0, jitter=0.1, idle_after=None,
+                 clock=time.monotonic, rng=None, autostart=True):
+        self.loader = loader
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.idle_after = idle_after
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._autostart = autostart
+
+        self._intervals = {}
+        self._last_used = {}
+        self._due = []  # куча (время, ключ)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+        self.dropped = 0
+
+        loader.refresh_scheduler = self
+
+    def _next_time(self, interval):
+        spread = interval * self.jitter
+        return self._clock() + interval + self._rng.uniform(-spread, spread)
+
+    def register(self, sheet_id, sheet_name, interval=None):
+        """Следить за листом. Повторная регистрация меняет только интервал."""
+        key = (sheet_id, sheet_name)
+        with self._lock:
+            is_new = key not in self._intervals
+            if interval is not None or is_new:
+                self._intervals[key] = interval or self.default_interval
+            self._last_used[key] = self._clock()
+            if is_new:
+                heapq.heappush(self._due, (self._next_time(self._intervals[key]), key))
+        if is_new and self._autostart:
+            self.start()
+
+    def unregister(self, sheet_id, sheet_name):
+        with self._lock:
+            self._intervals.pop((sheet_id, sheet_name), None)
+            self._last_used.pop((sheet_id, sheet_name), None)
+
+    def touch(self, sheet_id, sheet_name):
+        """Отметить обращение к листу: он ещё нужен, проверять его дальше."""
+        key = (sheet_id, sheet_name)
+        with self._lock:
+            if key in self._intervals:
+                self._last_used[key] = self._clock()
+
+    def request(self, sheet_id, sheet_name):
+        """Запросить внеочередную проверку (например, коллбек получил истёкшую копию)."""
+        key = (sheet_id, sheet_name)
+        with self._lock:
+            self._intervals.setdefault(key, self.default_interval)
+            self._last_used[key] = self._clock()
+            heapq.heappush(self._due, (self._clock(), key))
+        if self._autostart:
+            self.start()
+        self._wakeup.set()
+
+    def run_pending(self):
+        """Проверить все листы, чей срок подошёл. Возвращает число проверок."""
+        done = 0
+        while True:
+            with self._lock:
+                if not self._due or self._due[0][0] > self._clock():
+                    return done
+                _, key = heapq.heappop(self._due)
+                interval = self._intervals.get(key)
+                if interval is None:  # снят с наблюдения
+                    continue
+                # убираем дубли внеочередных запросов того же листа
+                self._due = [(t, k) for t, k in self._due if k != key]
+                heapq.heapify(self._due)
+                idle = (
+                    self.idle_after is not None
+                    and self._clock() - self._last_used.get(key, self._clock()) > self.idle_after
+                )
+                if idle:
+                    # Давно не открывали — не тратим на него квоту Google
+                    del self._intervals[key]
+                    self._last_used.pop(key, None)
+                    self.dropped += 1
+                    logger.info(f"[REFRESH] Лист {key} давно не открывали, снят с наблюдения")
+                    continue
+                heapq.heappush(self._due, (self._next_time(interval), key))
+
+            self._check(key)
+            done += 1
+
+    def _check(self, key):
+        self.checks += 1
+        try:
+            if self.loader.revalidate(*key):
+                self.changes += 1
+        except Exception as e:
+            # Ошибка не страшна: до следующей попытки отдаём старую копию
+            self.errors += 1
+            logger.warning(f"[REFRESH] Не удалось обновить {key}: {e}")
+
+    def _seconds_until_next(self):
+        with self._lock:
+            if not self._due:
+                return None
+            return max(0.0, self._due[0][0] - self._clock())
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.run_pending()
+            self._wakeup.wait(self._seconds_until_next())
+            self._wakeup.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="gsheet-refresh", daemon=True)
+            self._thread.start()
+        logger.info("[REFRESH] Фоновое обновление запущено")
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            watched = len(self._intervals)
+        return {
+            "watched": watched,
+            "checks": self.checks,
+            "changes": self.changes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
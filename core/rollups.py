@@ -0,0 +1,179 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from core import metrics
+from core.metric_index import MetricIndex
+
+logger = logging.getLogger(__name__)
+
+_ROLLUP_UPDATES = metrics.counter(
+    "rollup_updates_total", "Обновления итогов по дням/неделям/месяцам", ["mode"])
+
+# Гранулярность -> подпись периода на графиках
+FREQS = {
+    "D": "%d.%m",
+    "W": "%d.%m",     # понедельник недели
+    "M": "%m.%Y",
+}
+
+
+def period_starts(dates, freq):
+    """
+    Начало периода (день, понедельник недели, первое число месяца) для каждой
+    даты — массив datetime64[D]. Считается в numpy: DatetimeIndex на каждой
+    операции заново выводит частоту ряда, и это дороже самих сумм.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if freq == "D":
+        return days
+    if freq == "W":
+        # 1970-01-01 — четверг: понедельник той же недели на (n + 3) % 7 дней раньше
+        n = days.astype(np.int64)
+        return (n - (n + 3) % 7).astype("datetime64[D]")
+    if freq == "M":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Неизвестная гранулярность: {freq}")
+
+
+def _scatter_add(sums, codes, block):
+    """Прибавить колонки block к колонкам sums с номерами периодов codes."""
+    if not block.shape[1]:
+        return
+    if np.all(codes[1:] >= codes[:-1]):
+        # дни по порядку — периоды идут подряд: одна свёртка отрезков
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        bounds = np.concatenate(([0], bounds))
+        sums[:, codes[bounds]] += np.add.reduceat(block, bounds, axis=1)
+        return
+    # дни × периоды из нулей и единиц: группировка — одно матричное умножение
+    onehot = np.zeros((block.shape[1], sums.shape[1]), dtype=np.float64)
+    onehot[np.arange(block.shape[1]), codes] = 1.0
+    sums += block @ onehot
+
+
+def _aggregate(daily, keys):
+    """(начала периодов, номер периода каждого дня, суммы показатели × периоды) с нуля."""
+    if np.all(keys[1:] > keys[:-1]):
+        # каждый день — свой период (дневные итоги без дублей дат): суммы — сами значения
+        return keys, np.arange(len(keys)), daily
+    starts, codes = np.unique(keys, return_inverse=True)
+    total = np.zeros((daily.shape[0], len(starts)), dtype=np.float64)
+    _scatter_add(total, codes, daily)
+    return starts, codes, total
+
+
+class Rollup:
+    """
+    Материализованные итоги листа: суммы каждого показателя по дням, неделям
+    и месяцам (колонки без даты не входят). Объект неизменяемый — update()
+    возвращает новый, поэтому его можно отдавать нескольким коллбекам сразу.
+
+    Для следующей версии листа нужны дневные значения (NaN = 0) и номер периода
+    каждого дня. Какие колонки изменились, update() не ищет сам: их уже знает
+    MetricMatrix.from_frame (matrix.changes) — пересчитываются только периоды
+    этих колонок и дописанных дней. Нет этих сведений — полный пересчёт.
+    """
+
+    def __init__(self, labels, columns, dates, daily, sums, source=None):
+        self.labels = labels
+        self.columns = columns
+        self.dates = dates
+        self.daily = daily
+        # freq -> (начала периодов, номер периода каждого дня, суммы показатели × периоды)
+        self.sums = sums
+        # MetricMatrix.serial матрицы, из которой посчитаны итоги
+        self.source = source
+        self._index = None
+
+    @staticmethod
+    def _days(matrix, day_pos):
+        values = matrix.values[:, day_pos]
+        daily = np.where(np.isnan(values), 0.0, values)
+        dates = np.asarray(matrix.dates, dtype="datetime64[D]")[day_pos]
+        return [matrix.columns[i] for i in day_pos], dates, daily
+
+    @classmethod
+    def from_previous(cls, matrix, previous=None):
+        """Итоги новой версии листа: из итогов прошлой версии (previous), если она есть."""
+        if previous is None:
+            rollup, change = cls.build(matrix), {"mode": "full"}
+        else:
+            rollup, change = previous.update(matrix)
+        _ROLLUP_UPDATES.inc(change["mode"])
+        logger.info(f"[ROLLUPS] Итоги по периодам: {change}")
+        return rollup
+
+    @classmethod
+    def build(cls, matrix):
+        columns, dates, daily = cls._days(matrix, matrix.day_positions)
+        sums = {freq: _aggregate(daily, period_starts(dates, freq)) for freq in FREQS}
+        return cls(list(matrix.labels), columns, dates, daily, sums, source=matrix.serial)
+
+    def update(self, matrix):
+        """
+        Итоги для новой версии листа и что изменилось: (Rollup, {"mode", "changed", "appended"}).
+        Матрица не из этой версии (matrix.changes), другие показатели или
+        изменённый набор старых дней — полный пересчёт.
+        """
+        full = {"mode": "full", "changed": None, "appended": None}
+        changes = matrix.changes
+        if changes is None or changes[0] != self.source or list(matrix.labels) != self.labels:
+            return Rollup.build(matrix), full
+
+        day_pos = matrix.day_positions
+        columns, dates, daily = self._days(matrix, day_pos)
+        n_old = len(self.columns)
+        if columns[:n_old] != self.columns or not np.array_equal(dates[:n_old], self.dates):
+            return Rollup.build(matrix), full
+
+        # Старые дни, которые from_frame разобрал заново (сырые ячейки изменились)
+        reparsed = np.zeros(matrix.shape[1], dtype=bool)
+        reparsed[changes[1]] = True
+        changed = np.flatnonzero(reparsed[day_pos[:n_old]])
+        delta = daily[:, changed] - self.daily[:, changed]
+
+        sums = {}
+        for freq, (starts, codes, old) in self.sums.items():
+            if old is self.daily:
+                # дневные итоги и были значениями — пересчитывать нечего
+                sums[freq] = _aggregate(daily, period_starts(dates, freq))
+                continue
+            keys = period_starts(dates[n_old:], freq)
+            new_starts = np.union1d(starts, keys)
+            if len(new_starts) == len(starts):
+                total = old.copy()
+            else:
+                moved = np.searchsorted(new_starts, starts)
+                total = np.zeros((old.shape[0], len(new_starts)), dtype=np.float64)
+                total[:, moved] = old
+                codes = moved[codes]
+            codes = np.concatenate((codes, np.searchsorted(new_starts, keys)))
+            _scatter_add(total, codes[changed], delta)
+            _scatter_add(total, codes[n_old:], daily[:, n_old:])
+            sums[freq] = (new_starts, codes, total)
+
+        rollup = Rollup(self.labels, columns, dates, daily, sums, source=matrix.serial)
+        return rollup, {"mode": "incremental", "changed": len(changed), "appended": len(dates) - n_old}
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = MetricIndex(self.labels)
+        return self._index
+
+    def periods(self, freq):
+        """Подписи периодов гранулярности freq."""
+        return list(pd.DatetimeIndex(self.sums[freq][0]).strftime(FREQS[freq]))
+
+    def row(self, label, freq):
+        """Суммы показателя по периодам freq или None."""
+        i = self.index.lookup(label)
+        return None if i is None else self.sums[freq][2][i]
+
+    def table(self, freq):
+        """Широкая таблица: Показатель + колонка на каждый период."""
+        df = pd.DataFrame(self.sums[freq][2], columns=self.periods(freq))
+        df.insert(0, "Показатель", self.labels)
+        return df
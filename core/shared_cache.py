@@ -0,0 +1,399 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+import pandas as pd
+
+from core.matrix import MetricMatrix
+from core.snapshot_cache import SnapshotCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: gunicorn там не запускается, общий кэш не нужен
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    Общий для всех воркеров gunicorn кэш разобранных листов.
+
+    Кадры лежат в каталоге (лучше в /dev/shm) как Feather без сжатия и читаются
+    через memory map: строки остаются в буферах Arrow, поэтому страницы файла
+    делят все воркеры через page cache ОС, а не копируют их к себе. Это так
+    с pandas 3, где строки по умолчанию в Arrow (requirements.txt: pandas>=3);
+    pandas 2 при to_pandas() скопировал бы каждый лист в object-колонки.
+    Числовые матрицы (MetricMatrix) — .npy, открываемые np.load(mmap_mode="r").
+
+    Заполнение записи идёт под межпроцессной блокировкой (flock на файл ключа):
+    первый воркер идёт в Google, остальные ждут и читают его результат.
+    Без pyarrow или fcntl кэш выключен (enabled = False) — лоадер работает как раньше.
+
+    Каталог создаётся с правами 0o700; чужой (или открытый на запись другим)
+    каталог не используется — кэш выключается. Метаданные матриц — JSON и .npy,
+    без pickle: из кэша ничего не исполняется.
+    """
+
+    def __init__(self, directory, ttl=300.0, matrix_max_age=24 * 3600,
+                 matrix_versions=2, matrix_max_bytes=None):
+        self.directory = directory
+        self.ttl = ttl
+        # Матрицы лежат в памяти (/dev/shm): на лист — текущая и прошлая версии
+        # (прошлая нужна для частичного разбора), всего — не больше matrix_max_bytes
+        self.matrix_max_age = matrix_max_age
+        self.matrix_versions = matrix_versions
+        self.matrix_max_bytes = matrix_max_bytes
+
+        self.hits = 0
+        self.fills = 0
+        self.waited = 0
+        self.enabled = fcntl is not None and self._private_directory(directory)
+        if not self.enabled:
+            logger.warning("[SHARED CACHE] Общий кэш отключён (нет fcntl или каталог недоступен)")
+            return
+        self._frames = SnapshotCache(os.path.join(directory, "frames"))
+        self.enabled = self._frames.enabled
+        if not self.enabled:
+            logger.warning("[SHARED CACHE] Общий кэш отключён (нет pyarrow)")
+            return
+        self._locks_dir = os.path.join(directory, "locks")
+        self._matrix_dir = os.path.join(directory, "matrices")
+        os.makedirs(self._locks_dir, exist_ok=True)
+        os.makedirs(self._matrix_dir, exist_ok=True)
+
+    @staticmethod
+    def _private_directory(directory):
+        """
+        Создать каталог кэша с правами 0o700 и проверить, что он наш.
+        Каталог в общем /dev/shm мог заранее создать другой пользователь
+        и подложить туда свои файлы — такой не используем.
+        """
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            st = os.lstat(directory)
+        except OSError as e:
+            logger.warning(f"[SHARED CACHE] Каталог {directory} недоступен: {e}")
+            return False
+        if not os.path.isdir(directory) or os.path.islink(directory):
+            logger.warning(f"[SHARED CACHE] {directory} — не каталог")
+            return False
+        if st.st_uid != os.getuid():
+            logger.warning(f"[SHARED CACHE] Каталог {directory} принадлежит другому пользователю (uid {st.st_uid})")
+            return False
+        if st.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+        return True
+
+    def _lock_path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self._locks_dir, f"{digest}.lock")
+
+    def _remove_lock(self, path):
+        """
+        Удалить файл блокировки, только взяв её: иначе новый процесс создал бы
+        другой файл и вошёл бы одновременно с тем, кто держит старый. Занята — пропускаем.
+        """
+        try:
+            with open(path, "a+") as fh:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return
+                if os.fstat(fh.fileno()).st_ino == os.stat(path).st_ino:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def _locked(self, key):
+        """Эксклюзивная блокировка ключа между процессами (и потоками — у каждого свой fd)."""
+        path = self._lock_path(key)
+        while True:
+            fh = open(path, "a+")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.waited += 1
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            # Файл блокировки могли удалить при очистке, пока мы ждали:
+            # тогда блокировка на старом inode ничего не защищает — берём заново
+            try:
+                same = os.fstat(fh.fileno()).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                same = False
+            if same:
+                break
+            fh.close()
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+            fh.close()
+
+    def _is_fresh(self, info, revision):
+        if info is None:
+            return False
+        if revision is not None:
+            return info.get("revision") == str(revision)
+        return not self.ttl or time.time() - info.get("saved_at", 0) <= self.ttl
+
+    def _read(self, key):
+        info = self._frames.info(key)
+        if info is None:
+            return None, None
+        df = self._frames.load(key)
+        return (df, info) if df is not None else (None, None)
+
+    def get(self, key, revision=None):
+        """
+        (DataFrame, метаданные) свежей записи или (None, None).
+        Свежая — с той же ревизией, а без ревизии — не старше ttl.
+        """
+        if not self.enabled:
+            return None, None
+        if not self._is_fresh(self._frames.info(key), revision):
+            return None, None
+        df, info = self._read(key)
+        if df is not None:
+            self.hits += 1
+        return df, info
+
+    def _save(self, key, df, revision, extra):
+        self._frames.save(key, df, revision=revision, extra=extra)
+        self.fills += 1
+        # Отдаём копию из общего файла, а не свою — так память воркера не растёт
+        shared, info = self._read(key)
+        if shared is None:
+            return df, {**(extra or {}), "revision": revision}
+        return shared, info
+
+    def put(self, key, df, revision=None, extra=None):
+        """Записать кадр в общий кэш -> (DataFrame из общего файла, метаданные)."""
+        if not self.enabled:
+            return df, extra
+        with self._locked(key):
+            return self._save(key, df, revision, extra)
+
+    def get_or_fill(self, key, fill, revision=None, force=False):
+        """
+        Свежая запись или результат fill() -> (DataFrame, extra-метаданные),
+        записанный в общий кэш. Одновременно fill() выполняет только один процесс.
+        force — заполнить заново, если запись не обновили, пока мы ждали блокировку.
+        """
+        if not self.enabled:
+            return fill()
+        if not force:
+            df, info = self.get(key, revision)
+            if df is not None:
+                return df, info
+
+        started = time.time()
+        with self._locked(key):
+            info = self._frames.info(key)
+            if (force and info is not None and info.get("saved_at", 0) >= started) or \
+                    (not force and self._is_fresh(info, revision)):
+                df, info = self._read(key)
+                if df is not None:
+                    self.hits += 1
+                    return df, info
+            df, extra = fill()
+            return self._save(key, df, revision, extra)
+
+    def get_or_fill_many(self, keys, fill_many):
+        """
+        Как get_or_fill для нескольких ключей сразу: fill_many(ключи-промахи)
+        -> {ключ: (DataFrame, extra)}, например один batchGet на все листы.
+        Блокировки берутся в отсортированном порядке, чтобы не было взаимоблокировок.
+        """
+        if not self.enabled:
+            return fill_many(list(keys))
+
+        result = {}
+        for key in keys:
+            df, info = self.get(key)
+            if df is not None:
+                result[key] = (df, info)
+        missing = [key for key in keys if key not in result]
+        if not missing:
+            return result
+
+        with ExitStack() as stack:
+            for key in sorted(missing):
+                stack.enter_context(self._locked(key))
+            still_missing = []
+            for key in missing:
+                df, info = self.get(key)
+                if df is None:
+                    still_missing.append(key)
+                else:
+                    result[key] = (df, info)
+            if still_missing:
+                for key, (df, extra) in fill_many(still_missing).items():
+                    result[key] = self._save(key, df, None, extra)
+        return result
+
+    def _matrix_paths(self, version):
+        base = os.path.join(self._matrix_dir, str(version))
+        return base + ".values.npy", base + ".prefix.npy", base + ".dates.npy", base + ".meta.json"
+
+    def _read_matrix(self, version):
+        values_path, prefix_path, dates_path, meta_path = self._matrix_paths(version)
+        # meta пишется последней — если она есть, массивы уже на месте
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+            # allow_pickle=False (по умолчанию): только числовые массивы
+            values = np.load(values_path, mmap_mode="r")
+            prefix = np.load(prefix_path, mmap_mode="r")
+            dates = pd.DatetimeIndex(np.load(dates_path))
+        except Exception as e:
+            logger.warning(f"[SHARED CACHE] Повреждённая матрица {version}: {e}")
+            return None
+        return MetricMatrix(meta["labels"], meta["columns"], values, dates, prefix=prefix)
+
+    @staticmethod
+    def _json_columns(columns):
+        # Колонки из Google — строки; даты и прочие объекты в JSON не переживут обратный путь
+        return all(isinstance(c, (str, int, float)) and not isinstance(c, bool) for c in columns)
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self._matrix_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                write(fh)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def matrix(self, version, build, sheet=None):
+        """
+        MetricMatrix версии кадра: значения и накопленные суммы — read-only memmap,
+        общий для всех воркеров. build() строит матрицу, если её ещё нет.
+        sheet — ключ листа: старые версии того же листа удаляются.
+        """
+        if not self.enabled or version is None:
+            return build()
+        if not str(version).isalnum():
+            # version — часть имени файла: только отпечаток кадра (hex)
+            return build()
+
+        matrix = self._read_matrix(version)
+        if matrix is not None:
+            self.hits += 1
+            return matrix
+
+        with self._locked(f"matrix:{version}"):
+            matrix = self._read_matrix(version)
+            if matrix is not None:
+                self.hits += 1
+                return matrix
+
+            built = build()
+            if not self._json_columns(built.columns):
+                return built
+            values_path, prefix_path, dates_path, meta_path = self._matrix_paths(version)
+            meta = {"sheet": sheet, "labels": list(built.labels), "columns": list(built.columns)}
+            dates = np.asarray(built.dates.values, dtype="datetime64[ns]")
+            try:
+                self._write_atomic(values_path, lambda fh: np.save(fh, built.values))
+                self._write_atomic(prefix_path, lambda fh: np.save(fh, built.prefix))
+                self._write_atomic(dates_path, lambda fh: np.save(fh, dates))
+                self._write_atomic(meta_path, lambda fh: fh.write(
+                    json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+            except Exception as e:
+                logger.warning(f"[SHARED CACHE] Не удалось сохранить матрицу {version}: {e}")
+                return built
+            self.fills += 1
+            self._prune_matrices(current=str(version), sheet=sheet)
+
+        matrix = self._read_matrix(version)
+        if matrix is None:
+            return built
+        # Что разобрано заново с прошлой версии, знает только построивший воркер
+        matrix.changes = built.changes
+        return matrix
+
+    def _matrix_versions(self):
+        """{версия: (время записи, лист, байт)} по всем матрицам в каталоге."""
+        versions = {}
+        for name in os.listdir(self._matrix_dir):
+            if not name.endswith(".meta.json"):
+                continue
+            version = name[:-len(".meta.json")]
+            try:
+                paths = self._matrix_paths(version)
+                with open(paths[-1], encoding="utf-8") as fh:
+                    sheet = json.load(fh).get("sheet")
+                size = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+                versions[version] = (os.path.getmtime(paths[-1]), sheet, size)
+            except (OSError, ValueError):
+                continue
+        return versions
+
+    def _remove_matrix(self, version):
+        for path in self._matrix_paths(version):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._remove_lock(self._lock_path(f"matrix:{version}"))
+        logger.info(f"[SHARED CACHE] Удалена матрица {version}")
+
+    def _prune_matrices(self, current=None, sheet=None):
+        # Удалённый файл остаётся доступен тем, кто его уже отобразил в память
+        versions = self._matrix_versions()
+        newest_first = sorted(versions, key=lambda v: versions[v][0], reverse=True)
+        # Старые версии того же листа
+        if sheet is not None:
+            same_sheet = [v for v in newest_first if versions[v][1] == sheet and v != current]
+            for version in same_sheet[max(self.matrix_versions - 1, 0):]:
+                self._remove_matrix(version)
+                del versions[version]
+        # Общий бюджет: самые старые матрицы, кроме только что записанной
+        if self.matrix_max_bytes is not None:
+            total = sum(size for _, _, size in versions.values())
+            for version in reversed(newest_first):
+                if total <= self.matrix_max_bytes:
+                    break
+                if version == current or version not in versions:
+                    continue
+                total -= versions.pop(version)[2]
+                self._remove_matrix(version)
+
+        cutoff = time.time() - self.matrix_max_age
+        for name in os.listdir(self._matrix_dir):
+            path = os.path.join(self._matrix_dir, name)
+            try:
+                # .meta.pkl — прежний формат метаданных, больше не читается
+                if name.endswith(".meta.pkl") or os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+        # Старые блокировки (в основном matrix:<версия>) — тоже
+        for name in os.listdir(self._locks_dir):
+            path = os.path.join(self._locks_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    self._remove_lock(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {"enabled": self.enabled, "hits": self.hits, "fills": self.fills, "waited": self.waited}
+
+    def clear(self):
+        if not self.enabled:
+            return
+        self._frames.clear()
+        for name in os.listdir(self._matrix_dir):
+            os.remove(os.path.join(self._matrix_dir, name))
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow не установлен — снимки просто отключены
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    Локальные снимки загруженных листов в формате Arrow/Feather (без сжатия).
+
+    Ключ — строка источника ("gsheet:<id>:<лист>", "excel:<путь>:<лист>"),
+    к снимку привязана ревизия (mtime файла и т.п.) и время сохранения.
+    Чтение идёт через memory map, поэтому тёплый старт и офлайн-режим
+    обходятся без запросов к Google и без openpyxl.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.enabled = pa is not None
+        if not self.enabled:
+            logger.warning("[SNAPSHOT] pyarrow не установлен — снимки на диске отключены")
+            return
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, source_key):
+        digest = hashlib.sha1(source_key.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.directory, f"{digest}.feather")
+
+    @staticmethod
+    def _to_table(df):
+        df = df.copy()
+        df.columns = [str(c) for c in df.columns]
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Смешанные типы в object-колонке (числа вперемешку со строками из Excel)
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].astype("string")
+            return pa.Table.from_pandas(df, preserve_index=False)
+
+    def save(self, source_key, df, revision=None, extra=None):
+        """Сохранить снимок. extra — доп. поля метаданных. Ошибки записи только логируются."""
+        if not self.enabled:
+            return False
+        if df.columns.duplicated().any():
+            logger.info(f"[SNAPSHOT] Дубли колонок, снимок не сохраняю: {source_key}")
+            return False
+        tmp_path = None
+        try:
+            table = self._to_table(df)
+            meta = dict(table.schema.metadata or {})
+            meta[b"snapshot"] = json.dumps({
+                **(extra or {}),
+                "source": source_key,
+                "revision": None if revision is None else str(revision),
+                "saved_at": time.time(),
+            }).encode("utf-8")
+            table = table.replace_schema_metadata(meta)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, self._path(source_key))
+            return True
+        except Exception as e:
+            logger.warning(f"[SNAPSHOT] Не удалось сохранить {source_key}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def info(self, source_key):
+        """Метаданные снимка (source, revision, saved_at) или None."""
+        if not self.enabled:
+            return None
+        path = self._path(source_key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, "r") as source:
+                schema = pa.ipc.open_file(source).schema
+            return json.loads(schema.metadata[b"snapshot"])
+        except Exception as e:
+            logger.warning(f"[SNAPSHOT] Повреждённый снимок {path}: {e}")
+            return None
+
+    def load(self, source_key, revision=None, max_age=None):
+        """
+        Прочитать снимок через memory map.
+        None, если снимка нет, ревизия не совпала или он старше max_age секунд.
+        """
+        if not self.enabled:
+            return None
+        info = self.info(source_key)
+        if info is None or info.get("source") != source_key:
+            return None
+        if revision is not None and info.get("revision") != str(revision):
+            return None
+        if max_age is not None and time.time() - info.get("saved_at", 0) > max_age:
+            return None
+
+        try:
+            table = feather.read_table(self._path(source_key), memory_map=True)
+            df = table.to_pandas()
+            logger.info(f"[SNAPSHOT] Загружен снимок {source_key}: {df.shape}")
+            return df
+        except Exception as e:
+            logger.warning(f"[SNAPSHOT] Ошибка чтения {source_key}: {e}")
+            return None
+
+    def clear(self):
+        if not self.enabled:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".feather"):
+                os.remove(os.path.join(self.directory, name))
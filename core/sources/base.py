@@ -0,0 +1,183 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from config import Config
+from core import metrics
+from core.cache import TTLCache
+from core.sources.header import frame_from_rows
+
+logger = logging.getLogger(__name__)
+
+# kind: excel / gsheet / file; result: cache — из кэша источников, load — загрузка
+# (Google Sheets кэширует сам, см. GoogleSheetsLoader; его load_many — один замер на пачку)
+_LOAD_SECONDS = metrics.histogram(
+    "source_load_seconds", "DataSource.load, сек", ["kind", "result"])
+_LOAD_ERRORS = metrics.counter(
+    "source_load_errors_total", "Ошибки загрузки листов из источников", ["kind"])
+
+# Разобранные листы источников с ревизией: (вид, источник, лист, ревизия) -> DataFrame
+_frames = TTLCache(maxsize=Config.SOURCE_CACHE_MAX_ENTRIES, ttl=0)
+
+# Вид источника -> модуль с его классом (импортируется при первом обращении)
+_MODULES = {
+    "excel": "core.sources.excel",
+    "gsheet": "core.sources.gsheet",
+    "file": "core.sources.files",
+}
+# Расширение файла -> вид источника
+_SUFFIXES = {
+    ".xlsx": "excel",
+    ".xlsm": "excel",
+    ".csv": "file",
+    ".parquet": "file",
+}
+
+
+class DataSource:
+    """
+    Источник листов отчёта: Excel, Google Sheets, CSV/Parquet.
+
+    Backend задаёт list_sheets() и fetch_rows(sheet) — сырые строки листа;
+    DataFrame из них собирает общий frame_from_rows (заголовок, пустые хвосты).
+    Если у листа есть ревизия (mtime файла), разобранный лист кэшируется
+    в общем для всех источников кэше, пока ревизия не изменится.
+    Подклассы с kind регистрируются сами (DataSource.registry).
+    """
+
+    kind = None
+    registry = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.kind:
+            DataSource.registry[cls.kind] = cls
+
+    @property
+    def id(self):
+        """Идентификатор источника в кэше: путь, sheet_id."""
+        raise NotImplementedError
+
+    def list_sheets(self):
+        raise NotImplementedError
+
+    def fetch_rows(self, sheet):
+        raise NotImplementedError
+
+    def revision(self, sheet):
+        """Ревизия листа для кэша (mtime и т.п.); None — не кэшировать."""
+        return None
+
+    def fetch_frame(self, sheet):
+        return frame_from_rows(self.fetch_rows(sheet))
+
+    def default_sheet(self, prefix="Отчет"):
+        """Первый лист «Отчет…» — как ExcelLoader без явного листа."""
+        reports = [name for name in self.list_sheets() if str(name).startswith(prefix)]
+        if not reports:
+            raise ValueError(f"Не найдены листы, начинающиеся с '{prefix}'")
+        return reports[0]
+
+    @contextmanager
+    def _measured(self, sheets, started=None):
+        """Загрузка листов sheets: время — в source_load_seconds, ошибка — в source_load_errors_total."""
+        started = time.perf_counter() if started is None else started
+        try:
+            yield
+        except Exception as e:
+            _LOAD_ERRORS.inc(self.kind)
+            logger.error(f"[SOURCES] Ошибка загрузки {self.kind}:{self.id}:{sheets}: {e}")
+            raise
+        _LOAD_SECONDS.observe(time.perf_counter() - started, self.kind, "load")
+
+    def load(self, sheet=None):
+        sheet = self.default_sheet() if sheet is None else sheet
+        started = time.perf_counter()
+
+        revision = self.revision(sheet)
+        cache_key = (self.kind, self.id, sheet, revision)
+        if revision is not None:
+            df = _frames.get(cache_key)
+            if df is not None:
+                _LOAD_SECONDS.observe(time.perf_counter() - started, self.kind, "cache")
+                return df
+
+        with self._measured(sheet, started):
+            df = self.fetch_frame(sheet)
+            if revision is not None:
+                _frames.set(cache_key, df)
+        return df
+
+    def load_many(self, sheets):
+        """{лист: DataFrame} в порядке sheets (пустые и повторы пропускаются)."""
+        return {sheet: self.load(sheet) for sheet in dict.fromkeys(s for s in sheets if s)}
+
+    async def aload_many(self, sheets, semaphore):
+        """
+        Листы конкурентно: каждый — в потоке (разбор и ввод-вывод блокирующие),
+        одновременно не больше, чем позволяет semaphore.
+        """
+        async def one(sheet):
+            async with semaphore:
+                return sheet, await asyncio.to_thread(self.load, sheet)
+
+        sheets = list(dict.fromkeys(s for s in sheets if s))
+        return dict(await asyncio.gather(*(one(sheet) for sheet in sheets)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.id!r})"
+
+
+async def fetch_all(requests, limit=None):
+    """
+    Загрузить листы многих источников конкурентно.
+    requests — [(источник, [листы])]; одновременно идёт не больше limit
+    загрузок (Config.SOURCE_CONCURRENCY). Возвращает [{лист: DataFrame}] в порядке requests.
+    """
+    semaphore = asyncio.Semaphore(limit or Config.SOURCE_CONCURRENCY)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(source.aload_many(sheets, semaphore) for source, sheets in requests))
+    logger.info(
+        f"[SOURCES] Загружено листов: {sum(len(r) for r in results)} из {len(requests)} источников "
+        f"за {time.perf_counter() - started:.2f} с"
+    )
+    return results
+
+
+def load_all(requests, limit=None):
+    """fetch_all для синхронного кода (коллбеки Dash, скрипты)."""
+    results = []
+
+    async def run():
+        # Кадры не возвращаются из главной задачи: asyncio.run при снятии обработчика
+        # SIGINT строит repr задачи вместе с результатом, а repr DataFrame дорогой
+        results.extend(await fetch_all(requests, limit))
+
+    asyncio.run(run())
+    return results
+
+
+def source_class(kind):
+    if kind not in DataSource.registry:
+        if kind not in _MODULES:
+            raise ValueError(f"Неизвестный вид источника: {kind}")
+        importlib.import_module(_MODULES[kind])
+    return DataSource.registry[kind]
+
+
+def open_source(location, **kwargs):
+    """
+    Источник по адресу: "gsheet:<sheet_id>" (нужен loader=GoogleSheetsLoader),
+    путь к Excel / CSV / Parquet или папка с CSV/Parquet.
+    """
+    if location.startswith("gsheet:"):
+        return source_class("gsheet")(location[len("gsheet:"):], **kwargs)
+    if os.path.isdir(location):
+        return source_class("file")(location, **kwargs)
+    kind = _SUFFIXES.get(os.path.splitext(location)[1].lower())
+    if kind is None:
+        raise ValueError(f"Неизвестный тип источника: {location}")
+    return source_class(kind)(location, **kwargs)
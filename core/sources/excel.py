@@ -0,0 +1,27 @@
+import os
+
+from core.loaders.excel_loader import ExcelLoader
+from core.sources.base import DataSource
+
+
+class ExcelSource(DataSource):
+    """Книга Excel: листы читает ExcelLoader (calamine или потоковый openpyxl)."""
+
+    kind = "excel"
+
+    def __init__(self, path, engine="auto"):
+        self.path = os.path.abspath(path)
+        self._loader = ExcelLoader(self.path, engine=engine)
+
+    @property
+    def id(self):
+        return self.path
+
+    def list_sheets(self):
+        return self._loader.sheet_names()
+
+    def revision(self, sheet):
+        return os.stat(self.path).st_mtime_ns
+
+    def fetch_rows(self, sheet):
+        return self._loader.read_rows(sheet)
@@ -0,0 +1,79 @@
+import csv
+import importlib.util
+import os
+
+import pandas as pd
+
+from core.sources.base import DataSource
+from core.sources.header import normalize_header
+
+# pyarrow нужен только для Parquet; проверяем наличие без импорта
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+_SUFFIXES = (".csv", ".parquet")
+
+
+class FileSource(DataSource):
+    """
+    Выгрузки отчёта в CSV / Parquet. Файл — один лист с именем файла без
+    расширения, папка — лист на каждый CSV/Parquet-файл в ней.
+    """
+
+    kind = "file"
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    @property
+    def id(self):
+        return self.path
+
+    def _files(self):
+        if not os.path.isdir(self.path):
+            return {os.path.splitext(os.path.basename(self.path))[0]: self.path}
+        files = {}
+        for name in sorted(os.listdir(self.path)):
+            stem, suffix = os.path.splitext(name)
+            if suffix.lower() in _SUFFIXES:
+                files.setdefault(stem, os.path.join(self.path, name))
+        return files
+
+    def _file(self, sheet):
+        files = self._files()
+        if sheet not in files:
+            raise ValueError(f"Лист не найден: {sheet} ({self.path})")
+        return files[sheet]
+
+    def list_sheets(self):
+        return list(self._files())
+
+    def default_sheet(self, prefix="Отчет"):
+        # У одиночного файла лист один, как бы он ни назывался
+        sheets = self.list_sheets()
+        if len(sheets) == 1:
+            return sheets[0]
+        return super().default_sheet(prefix)
+
+    def revision(self, sheet):
+        return os.stat(self._file(sheet)).st_mtime_ns
+
+    def fetch_rows(self, sheet):
+        with open(self._file(sheet), newline="", encoding="utf-8-sig") as f:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            return [[value if value != "" else None for value in row] for row in csv.reader(f, dialect)]
+
+    def fetch_frame(self, sheet):
+        path = self._file(sheet)
+        if not path.lower().endswith(".parquet"):
+            return super().fetch_frame(sheet)
+        if not HAS_PYARROW:
+            raise ImportError("Для чтения Parquet нужен pyarrow: pip install pyarrow")
+        # В Parquet колонки уже типизированы и заголовок — имена колонок
+        df = pd.read_parquet(path)
+        df.columns = normalize_header([str(c) for c in df.columns])
+        return df
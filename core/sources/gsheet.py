@@ -0,0 +1,40 @@
+import asyncio
+
+from core.sources.base import DataSource
+
+
+class GoogleSheetsSource(DataSource):
+    """
+    Таблица Google Sheets. Загрузку ведёт GoogleSheetsLoader: у него свой кэш
+    с фоновым обновлением, снимки, общий кэш воркеров, лимит запросов и batchGet,
+    поэтому ревизии здесь нет, а заголовок разбирается в самом лоадере тем же
+    core/sources/header.py (без маркера заголовок — вторая строка, под названием отчёта).
+    """
+
+    kind = "gsheet"
+
+    def __init__(self, sheet_id, loader):
+        self.sheet_id = sheet_id
+        self.loader = loader
+
+    @property
+    def id(self):
+        return self.sheet_id
+
+    def list_sheets(self):
+        return self.loader.list_sheets(self.sheet_id)
+
+    def fetch_frame(self, sheet):
+        return self.loader.load(self.sheet_id, sheet)
+
+    def load_many(self, sheets):
+        # Промахи кэша — одним запросом values.batchGet; в метриках источников —
+        # как и DataSource.load, только замер один на все листы
+        sheets = list(sheets)
+        with self._measured(sheets):
+            return self.loader.load_many(self.sheet_id, sheets)
+
+    async def aload_many(self, sheets, semaphore):
+        # Один batchGet на все листы таблицы — одно место в лимите
+        async with semaphore:
+            return await asyncio.to_thread(self.load_many, sheets)
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from config import Config
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    return isinstance(value, float) and value != value  # NaN
+
+
+def trim_rows(rows):
+    """
+    Срезать пустые хвосты листа: строки снизу и колонки справа без единого значения
+    (Google отдаёт всю сетку листа, openpyxl read_only не знает реальных границ).
+    Короткие строки дополняются None до общей ширины.
+    """
+    end = len(rows)
+    while end and all(_is_empty(v) for v in rows[end - 1]):
+        end -= 1
+    rows = rows[:end]
+
+    width = max((len(row) for row in rows), default=0)
+    while width and all(len(row) < width or _is_empty(row[width - 1]) for row in rows):
+        width -= 1
+    # Строки ровно нужной ширины не копируются (у Google это почти все)
+    return [
+        row if len(row) == width
+        else list(row[:width]) if len(row) > width
+        else list(row) + [None] * (width - len(row))
+        for row in rows
+    ]
+
+
+def find_header_row(rows, markers=None, scan=None, default=0):
+    """
+    Номер строки заголовка: первая из первых scan строк, в которой есть маркер
+    ("Показатель", "Модель"); над ней — шапка отчёта. Маркера нет — строка
+    default (у Excel и CSV — первая, как в pd.read_excel; у Google Sheets —
+    вторая: над заголовком строка с названием отчёта).
+    """
+    markers = set(Config.HEADER_MARKERS if markers is None else markers)
+    scan = Config.HEADER_SCAN_ROWS if scan is None else scan
+    for i, row in enumerate(rows[:scan]):
+        if any(isinstance(v, str) and v.strip() in markers for v in row):
+            return i
+    return min(default, max(len(rows) - 1, 0))
+
+
+def normalize_header(row):
+    """Как у pd.read_excel: пробелы по краям срезаются, пустые -> "Unnamed: i", дубли -> "x.1", "x.2"."""
+    columns, seen = [], {}
+    for i, value in enumerate(row):
+        name = value.strip() if isinstance(value, str) else value
+        if _is_empty(name):
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def frame_from_rows(rows):
+    """
+    DataFrame из сырых строк листа — общий разбор для всех источников
+    (Google Sheets, Excel, CSV): хвосты срезаются, строка заголовка находится
+    и нормализуется, строки выше неё отбрасываются.
+    """
+    rows = trim_rows(rows)
+    if not rows:
+        return pd.DataFrame()
+    header_row = find_header_row(rows)
+    return pd.DataFrame(rows[header_row + 1:], columns=normalize_header(rows[header_row]))
+
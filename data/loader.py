@@ -1,22 +1,38 @@
 # data/loader.py
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from typing import Optional
 from config import Config
+from core.sources.base import load_all, open_source
+from core.sources.excel import ExcelSource
+
 
 class DataLoader:
     def __init__(self, excel_path: Optional[str] = None, sa_path: Optional[str] = None):
         self.excel_path = excel_path or Config.EXCEL_PATH
         self.sa_path = sa_path or Config.SERVICE_ACCOUNT_FILE
         self.scopes = getattr(Config, "SCOPES", ["https://www.googleapis.com/auth/spreadsheets.readonly"])
+        self._gsheet_loader = None
 
     def load_excel(self, sheet_name: Optional[str] = None) -> pd.DataFrame:
-        return pd.read_excel(self.excel_path, sheet_name=sheet_name) if sheet_name else pd.read_excel(self.excel_path)
+        # Потоковое чтение одного листа с кэшем по (путь, mtime, лист)
+        source = ExcelSource(self.excel_path)
+        return source.load(sheet_name if sheet_name else source.list_sheets()[0])
+
+    def gsheet_source(self, sheet_id: str):
+        # Один GoogleSheetsLoader на DataLoader: его кэш и лимит запросов общие для всех таблиц
+        if self._gsheet_loader is None:
+            from core.loaders.gsheet_loader import GoogleSheetsLoader
+
+            self._gsheet_loader = GoogleSheetsLoader(self.sa_path, self.scopes)
+        return open_source(f"gsheet:{sheet_id}", loader=self._gsheet_loader)
 
     def load_gsheet(self, sheet_id: str, worksheet: str) -> pd.DataFrame:
-        creds = Credentials.from_service_account_file(self.sa_path, scopes=self.scopes)
-        client = gspread.authorize(creds)
-        ws = client.open_by_key(sheet_id).worksheet(worksheet)
-        values = ws.get_all_values()
-        return pd.DataFrame(values[1:], columns=values[0])
+        return self.gsheet_source(sheet_id).load(worksheet)
+
+    def load_file(self, path: str, sheet: Optional[str] = None) -> pd.DataFrame:
+        # Excel, CSV, Parquet или папка с выгрузками; sheet=None — лист по умолчанию
+        return open_source(path).load(sheet)
+
+    def load_all(self, requests, limit: Optional[int] = None):
+        # [(источник, [листы])] -> [{лист: DataFrame}], конкурентно (Config.SOURCE_CONCURRENCY)
+        return load_all(requests, limit)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# Тесты запускаются из корня репозитория: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import synthetic  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class CountingClient(synthetic.FakeClient):
+    """FakeClient, который считает походы за значениями листов."""
+
+    def __init__(self, books):
+        super().__init__(books)
+        self.fetches = []
+
+    def open_by_key(self, sheet_id):
+        spreadsheet = super().open_by_key(sheet_id)
+        worksheet = spreadsheet.worksheet
+
+        def counted(title):
+            self.fetches.append(title)
+            return worksheet(title)
+
+        spreadsheet.worksheet = counted
+        return spreadsheet
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def book():
+    """Таблица из двух листов «Отчет N» с шапкой над заголовком."""
+    return synthetic.report_book(2, 10, 7)
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from core.dimensions import DimensionTable
+from core.matrix import MetricMatrix
+
+SECTIONS = {"staff": {"sections": ["Сотрудники"], "exclude": ["Итого"]}}
+
+
+def make_matrix(rows):
+    """rows — [(показатель, значение за каждый из двух дней или "")]."""
+    df = pd.DataFrame({
+        "Показатель": [label for label, _ in rows],
+        "Ед. изм.": "шт",
+        "01.12": [value for _, value in rows],
+        "02.12": [value for _, value in rows],
+    })
+    return MetricMatrix.from_frame(df, year=2024)
+
+
+def test_section_keeps_entity_without_data():
+    matrix = make_matrix([
+        ("Входящие звонки - ВЗ", "10"),
+        ("Сотрудники", ""),
+        ("Мади", "5"),
+        ("Асель", ""),  # новый сотрудник: за период пусто
+        ("Ильяс", "3"),
+        ("Итого", "8"),
+        ("", ""),
+        ("Причина 1", "2"),
+    ])
+    table = DimensionTable.detect(matrix, SECTIONS)
+
+    assert table.entities("staff") == ["Мади", "Асель", "Ильяс"]
+    totals = table.totals(matrix, 0, 2, "staff")
+    assert dict(zip(totals["Сущность"], totals["Значение"])) == {"Мади": 10, "Асель": 0, "Ильяс": 6}
+
+
+def test_section_ends_on_known_metric():
+    matrix = make_matrix([
+        ("Сотрудники", ""),
+        ("Мади", "5"),
+        ("Входящие ВЗ", "10"),
+        ("Ильяс", "3"),
+    ])
+    table = DimensionTable.detect(matrix, SECTIONS)
+
+    assert table.entities("staff") == ["Мади"]
+
+
+def test_seed_template_takes_single_names_only():
+    matrix = make_matrix([
+        ("Входящие звонки - ВЗ", "10"),
+        ("Переадресовано успешно ВЗ", "7"),
+        ("Переадресовано Мади", "3"),
+        ("Переадресовано Ильяс", "2"),
+        ("Переадресовано Айгерим", "2"),
+        ("Переадресовано в отдел продаж", "1"),
+    ])
+    dimensions = {"staff": {"seeds": ["Мади", "Ильяс"]}}
+
+    assert DimensionTable.detect(matrix, dimensions).entities("staff") == ["Мади", "Ильяс", "Айгерим"]
+
+
+def test_seed_template_needs_two_seeds():
+    matrix = make_matrix([
+        ("Переадресовано Мади", "3"),
+        ("Переадресовано Айгерим", "2"),
+    ])
+    dimensions = {"staff": {"seeds": ["Мади", "Ильяс"]}}
+
+    assert DimensionTable.detect(matrix, dimensions).entities("staff") == ["Мади"]
@@ -0,0 +1,77 @@
+from conftest import CountingClient
+from core.loaders.gsheet_loader import GoogleSheetsLoader
+
+SHEET_ID = "test-sheet"
+TTL = 60
+
+
+def make_loader(book, clock, cache_maxsize=8):
+    client = CountingClient({SHEET_ID: book})
+    # Файла ключа нет: с готовым клиентом он и не нужен
+    loader = GoogleSheetsLoader("/nonexistent/service_account.json", [], client=client,
+                                cache_maxsize=cache_maxsize, cache_ttl=TTL, clock=clock)
+    return loader, client
+
+
+def test_injected_client_is_used(book, clock):
+    loader, client = make_loader(book, clock)
+    df = loader.load(SHEET_ID, "Отчет 1")
+
+    assert loader._get_client() is client
+    assert client.fetches == ["Отчет 1"]
+    assert list(df.columns[:2]) == ["Показатель", "Ед"]
+    assert len(df) == 10
+
+
+def test_hit_and_miss_counters(book, clock):
+    loader, client = make_loader(book, clock)
+    first = loader.load(SHEET_ID, "Отчет 1")
+    second = loader.load(SHEET_ID, "Отчет 1")
+
+    assert second is first
+    assert client.fetches == ["Отчет 1"]
+    stats = loader.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_entry_expires_after_ttl(book, clock):
+    loader, client = make_loader(book, clock)
+    first = loader.load(SHEET_ID, "Отчет 1")
+
+    clock.advance(TTL - 1)
+    assert loader.load(SHEET_ID, "Отчет 1") is first
+
+    clock.advance(2)
+    assert loader.load(SHEET_ID, "Отчет 1") is not first
+    assert client.fetches == ["Отчет 1", "Отчет 1"]
+    assert loader.cache_stats()["expirations"] == 1
+
+
+def test_least_recently_used_is_evicted(book, clock):
+    book["Отчет 3"] = book["Отчет 2"]
+    loader, client = make_loader(book, clock, cache_maxsize=2)
+    loader.load(SHEET_ID, "Отчет 1")
+    loader.load(SHEET_ID, "Отчет 2")
+    loader.load(SHEET_ID, "Отчет 1")  # "Отчет 2" теперь самый давний
+    loader.load(SHEET_ID, "Отчет 3")
+
+    assert loader.cache_stats()["evictions"] == 1
+    loader.load(SHEET_ID, "Отчет 1")
+    assert client.fetches == ["Отчет 1", "Отчет 2", "Отчет 3"]
+    loader.load(SHEET_ID, "Отчет 2")
+    assert client.fetches == ["Отчет 1", "Отчет 2", "Отчет 3", "Отчет 2"]
+
+
+def test_force_reload_bypasses_cache(book, clock):
+    loader, client = make_loader(book, clock)
+    first = loader.load(SHEET_ID, "Отчет 1")
+    book["Отчет 1"][2][2] = "999"
+
+    assert loader.load(SHEET_ID, "Отчет 1") is first
+    fresh = loader.load(SHEET_ID, "Отчет 1", force_reload=True)
+
+    assert fresh.iloc[0, 2] == "999"
+    assert client.fetches == ["Отчет 1", "Отчет 1"]
+    # Перезагруженная копия заменила старую в кэше
+    assert loader.load(SHEET_ID, "Отчет 1") is fresh
@@ -0,0 +1,108 @@
+import random
+
+from conftest import CountingClient
+from core.loaders.gsheet_loader import GoogleSheetsLoader
+from core.refresh import RefreshScheduler
+
+SHEET_ID = "test-sheet"
+TTL = 60
+INTERVAL = 120
+
+
+def make_loader(book, clock, cache_maxsize=8, idle_after=None):
+    client = CountingClient({SHEET_ID: book})
+    loader = GoogleSheetsLoader("", [], client=client, cache_maxsize=cache_maxsize,
+                                cache_ttl=TTL, clock=clock)
+    scheduler = RefreshScheduler(loader, default_interval=INTERVAL, jitter=0.0, idle_after=idle_after,
+                                 clock=clock, rng=random.Random(0), autostart=False)
+    return loader, scheduler, client
+
+
+def edit(book, sheet_name, value="999"):
+    # Первая ячейка данных под двухстрочной шапкой
+    book[sheet_name][2][2] = value
+
+
+def test_stale_copy_is_served_without_waiting(book, clock):
+    loader, scheduler, client = make_loader(book, clock)
+    first = loader.load(SHEET_ID, "Отчет 1")
+    edit(book, "Отчет 1")
+
+    clock.advance(TTL + 1)
+    stale = loader.load(SHEET_ID, "Отчет 1")
+
+    # Коллбек получил старую копию сразу, Google не трогали
+    assert stale is first
+    assert client.fetches == ["Отчет 1"]
+
+    # Внеочередная проверка уже в очереди — свежая копия приходит после неё
+    assert scheduler.run_pending() == 1
+    fresh = loader.load(SHEET_ID, "Отчет 1")
+    assert fresh is not first
+    assert fresh.iloc[0, 2] == "999"
+
+
+def test_run_pending_waits_for_interval(book, clock):
+    loader, scheduler, client = make_loader(book, clock)
+    loader.load(SHEET_ID, "Отчет 1")
+
+    assert scheduler.run_pending() == 0
+    clock.advance(INTERVAL - 1)
+    assert scheduler.run_pending() == 0
+    clock.advance(2)
+    assert scheduler.run_pending() == 1
+    # Следующая проверка — через интервал, а не сразу
+    assert scheduler.run_pending() == 0
+    assert scheduler.stats()["checks"] == 1
+
+
+def test_change_detection_by_content_hash(book, clock):
+    loader, scheduler, _ = make_loader(book, clock)
+    first = loader.load(SHEET_ID, "Отчет 1")
+
+    clock.advance(INTERVAL + 1)
+    scheduler.run_pending()
+    assert scheduler.stats()["changes"] == 0
+    assert loader.load(SHEET_ID, "Отчет 1") is first
+
+    edit(book, "Отчет 1")
+    clock.advance(INTERVAL + 1)
+    scheduler.run_pending()
+    assert scheduler.stats()["changes"] == 1
+    assert loader.load(SHEET_ID, "Отчет 1").iloc[0, 2] == "999"
+
+
+def test_evicted_sheet_is_not_refetched(book, clock):
+    loader, scheduler, client = make_loader(book, clock, cache_maxsize=1)
+    loader.load(SHEET_ID, "Отчет 1")
+    loader.load(SHEET_ID, "Отчет 2")  # вытесняет "Отчет 1" из кэша
+    fetched = list(client.fetches)
+
+    clock.advance(INTERVAL + 1)
+    scheduler.run_pending()
+
+    # Вытесненный лист не загружен заново и не засчитан как изменение
+    assert client.fetches.count("Отчет 1") == fetched.count("Отчет 1")
+    assert (SHEET_ID, "Отчет 1") not in loader._cache
+    stats = scheduler.stats()
+    assert stats["changes"] == 0
+    assert stats["watched"] == 1
+
+    clock.advance(INTERVAL + 1)
+    scheduler.run_pending()
+    assert client.fetches.count("Отчет 1") == fetched.count("Отчет 1")
+
+
+def test_idle_sheet_is_dropped(book, clock):
+    loader, scheduler, client = make_loader(book, clock, idle_after=INTERVAL * 2)
+    loader.load_many(SHEET_ID, ["Отчет 1", "Отчет 2"])
+
+    # "Отчет 1" открывают, "Отчет 2" только предзагрузили
+    for _ in range(3):
+        clock.advance(INTERVAL + 1)
+        loader.load(SHEET_ID, "Отчет 1")
+        scheduler.run_pending()
+
+    stats = scheduler.stats()
+    assert stats["watched"] == 1
+    assert stats["dropped"] == 1
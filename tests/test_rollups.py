@@ -0,0 +1,70 @@
+import numpy as np
+
+from bench import synthetic
+from core.matrix import MetricMatrix
+from core.rollups import FREQS, Rollup
+
+
+def versions(n_metrics=20, n_days=40, appended=9):
+    """(старая версия листа, новая): дописаны дни и исправлена одна старая ячейка."""
+    new = synthetic.sheet_frame(n_metrics, n_days)
+    old = new.iloc[:, :2 + n_days - appended]
+    new = new.copy()
+    new.iat[3, 5] = "1 000"
+    return old, new
+
+
+def assert_same(rollup, expected):
+    for freq in FREQS:
+        assert rollup.periods(freq) == expected.periods(freq)
+        np.testing.assert_allclose(rollup.table(freq).iloc[:, 1:], expected.table(freq).iloc[:, 1:])
+
+
+def test_update_matches_build():
+    old, new = versions()
+    old_matrix = MetricMatrix.from_frame(old, year=2024)
+    matrix = MetricMatrix.from_frame(new, year=2024, previous=(old, old_matrix))
+
+    rollup, change = Rollup.build(old_matrix).update(matrix)
+
+    assert change == {"mode": "incremental", "changed": 1, "appended": 9}
+    assert_same(rollup, Rollup.build(matrix))
+
+
+def test_update_chain_matches_build():
+    old, new = versions()
+    old_matrix = MetricMatrix.from_frame(old, year=2024)
+    matrix = MetricMatrix.from_frame(new, year=2024, previous=(old, old_matrix))
+    rollup, _ = Rollup.build(old_matrix).update(matrix)
+
+    newer = new.copy()
+    newer.iat[0, 2] = "7"
+    newer_matrix = MetricMatrix.from_frame(newer, year=2024, previous=(new, matrix))
+    rollup, change = rollup.update(newer_matrix)
+
+    assert change["mode"] == "incremental"
+    assert_same(rollup, Rollup.build(newer_matrix))
+
+
+def test_update_without_changes_is_full():
+    old, new = versions()
+    old_matrix = MetricMatrix.from_frame(old, year=2024)
+    # Матрица разобрана целиком — какие колонки изменились, неизвестно
+    matrix = MetricMatrix.from_frame(new, year=2024)
+
+    rollup, change = Rollup.build(old_matrix).update(matrix)
+
+    assert change["mode"] == "full"
+    assert_same(rollup, Rollup.build(matrix))
+
+
+def test_update_from_other_version_is_full():
+    old, new = versions()
+    old_matrix = MetricMatrix.from_frame(old, year=2024)
+    other_matrix = MetricMatrix.from_frame(old, year=2024)
+    matrix = MetricMatrix.from_frame(new, year=2024, previous=(old, other_matrix))
+
+    rollup, change = Rollup.build(old_matrix).update(matrix)
+
+    assert change["mode"] == "full"
+    assert_same(rollup, Rollup.build(matrix))
@@ -0,0 +1,54 @@
+from conftest import CountingClient
+from core.loaders.gsheet_loader import GoogleSheetsLoader
+from core.sources import base
+from core.sources.gsheet import GoogleSheetsSource
+from core.sources.header import frame_from_rows
+
+SHEET_ID = "test-sheet"
+
+# Лист без маркеров заголовка ("Показатель", "Модель")
+NO_MARKER = [
+    ["Отчёт за декабрь", "", ""],
+    ["Строка", "Ед", "01.12"],
+    ["Входящие", "шт", "5"],
+]
+
+
+def source_loads(kind):
+    """Число замеров source_load_seconds с result="load" для вида источника."""
+    return next(
+        (value for suffix, labels, _, value in base._LOAD_SECONDS.samples()
+         if suffix == "_count" and labels == (kind, "load")),
+        0,
+    )
+
+
+def test_google_sheet_without_marker_skips_title_row():
+    df = GoogleSheetsLoader._build_frame(NO_MARKER)
+
+    assert list(df.columns) == ["Строка", "Ед", "01.12"]
+    assert df.iloc[0, 0] == "Входящие"
+
+
+def test_google_sheet_marker_in_first_row():
+    values = [["Показатель", "Ед", "01.12"], ["Входящие", "шт", "5"]]
+
+    assert list(GoogleSheetsLoader._build_frame(values).columns) == ["Показатель", "Ед", "01.12"]
+
+
+def test_file_rows_without_marker_use_first_row():
+    df = frame_from_rows(NO_MARKER)
+
+    assert df.columns[0] == "Отчёт за декабрь"
+    assert len(df) == 2
+
+
+def test_gsheet_load_many_is_measured(book):
+    loader = GoogleSheetsLoader("", [], client=CountingClient({SHEET_ID: book}))
+    source = GoogleSheetsSource(SHEET_ID, loader)
+    before = source_loads("gsheet")
+
+    frames = source.load_many(["Отчет 1", "Отчет 2"])
+
+    assert list(frames) == ["Отчет 1", "Отчет 2"]
+    assert source_loads("gsheet") == before + 1
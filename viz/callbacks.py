@@ -1,29 +1,364 @@
 # viz/callbacks.py
 
-from dash import Input, Output, State
+from dash import Input, Output, Patch, State, ctx, html
 from dash.exceptions import PreventUpdate
 
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
+import dash_bootstrap_components as dbc
+import logging
 import re
+import threading
+import weakref
 
 from config import Config
+from core import metrics
+from core.comparison import ComparisonEngine
+from core.frame_store import FrameStore
+from core.long_store import infer_year
+from core.matrix import MetricMatrix
+from core.refresh import RefreshScheduler
+from core.processor import DataProcessor
+from core.rollups import Rollup
+from viz.charts import (
+    calls_funnel_traces,
+    calls_trend_traces,
+    internet_pie_traces,
+    reasons_bar_traces,
+    make_calls_funnel,
+    make_calls_trend,
+    make_internet_pie,
+    make_reasons_bar,
+    make_staff_bar,
+    make_staff_pie,
+    staff_bar_traces,
+    staff_pie_traces,
+    trend_points,
+    trend_ticks,
+)
+from viz.figure_cache import FigureCache, figure_signature, trace_patch
 from core.loaders.gsheet_loader import GoogleSheetsLoader
+from core.sources.gsheet import GoogleSheetsSource
+
+
+# Один общий лоадер для всего приложения. Создаётся при первом обращении
+# (get_loader), а не при импорте: воркер стартует без gspread / google-auth,
+# а отсутствующий service_account.json — ошибка коллбека, а не падение импорта.
+# Вместе с ним — снимки на диске и общий кэш воркеров: их каталоги
+# (cache/, /dev/shm) и проверки владельца тоже не нужны до первого листа
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def get_loader():
+    global _loader
+    if _loader is None:
+        with _loader_lock:
+            if _loader is None:
+                from core.shared_cache import SharedCache
+                from core.snapshot_cache import SnapshotCache
+
+                loader = GoogleSheetsLoader(
+                    service_account_file=Config.SERVICE_ACCOUNT_FILE,
+                    scopes=Config.SCOPES,
+                    cache_maxsize=Config.GSHEET_CACHE_MAX_ENTRIES,
+                    cache_ttl=Config.GSHEET_CACHE_TTL,
+                    # Снимки листов на диске — переживают рестарт воркеров
+                    snapshot_cache=SnapshotCache(Config.SNAPSHOT_DIR),
+                    snapshot_max_age=Config.SNAPSHOT_MAX_AGE,
+                    rate_limit_per_minute=Config.GSHEET_RATE_LIMIT_PER_MINUTE,
+                    rate_burst=Config.GSHEET_RATE_BURST,
+                    # Общий для воркеров gunicorn кэш листов и матриц: Google опрашивает один процесс
+                    shared_cache=SharedCache(
+                        Config.SHARED_CACHE_DIR,
+                        ttl=Config.SHARED_CACHE_TTL,
+                        matrix_versions=Config.SHARED_CACHE_MATRIX_VERSIONS,
+                        matrix_max_bytes=Config.SHARED_CACHE_MATRIX_MAX_BYTES,
+                    ),
+                )
+                # Фоновое обновление: коллбеки не ждут Google, свежая копия грузится в фоне
+                # (планировщик доступен как loader.refresh_scheduler)
+                RefreshScheduler(
+                    loader,
+                    default_interval=Config.GSHEET_REFRESH_INTERVAL,
+                    jitter=Config.GSHEET_REFRESH_JITTER,
+                    idle_after=Config.GSHEET_REFRESH_IDLE,
+                )
+                _loader = loader
+    return _loader
+
+
+def get_source(sheet_id):
+    """Таблица как источник core.sources поверх общего лоадера (его кэш, лимит, снимки)."""
+    return GoogleSheetsSource(sheet_id, get_loader())
+
+
+def warm_up():
+    """
+    Создать лоадер и сделать отложенные тяжёлые импорты заранее.
+    Для gunicorn --preload (Config.EAGER_STARTUP): всё это делается один раз
+    в мастер-процессе, воркеры получают готовое через fork.
+    """
+    import gspread  # noqa: F401
+    import plotly.express  # noqa: F401
+    from google.oauth2.service_account import Credentials  # noqa: F401
+
+    get_loader()
+
+# Серверный реестр кадров: в main-df / compare-df лежит только handle
+frame_store = FrameStore(max_bytes=Config.FRAME_STORE_MAX_BYTES)
+
+# Сравнение периодов с кэшем по (версия листа, диапазон A, диапазон B)
+comparison = ComparisonEngine()
+
+# Готовые фигуры по (версия листа, диапазон дней, id графика)
+figure_cache = FigureCache(maxsize=Config.FIGURE_CACHE_MAX_ENTRIES)
+
+logger = logging.getLogger(__name__)
+
 
+def _shared_hit_ratio():
+    if _loader is None or _loader.shared_cache is None:
+        return None
+    shared = _loader.shared_cache.stats()
+    shared_lookups = shared["hits"] + shared["fills"]
+    return shared["hits"] / shared_lookups if shared_lookups else 0.0
 
-# Один общий лоадер для всего приложения
-loader = GoogleSheetsLoader(
-    service_account_file=Config.SERVICE_ACCOUNT_FILE,
-    scopes=Config.SCOPES,
+
+def _cache_hit_ratios():
+    return [
+        (("gsheet",), _loader.cache_stats()["hit_ratio"] if _loader is not None else None),
+        (("figure",), figure_cache.stats()["hit_ratio"]),
+        (("comparison",), comparison.cache_stats()["hit_ratio"]),
+        (("shared",), _shared_hit_ratio()),
+    ]
+
+
+metrics.gauge_callback("cache_hit_ratio", "Доля попаданий в кэш", ["cache"], _cache_hit_ratios)
+metrics.gauge_callback(
+    "frame_store_bytes", "Объём кадров в серверном реестре, байт", [],
+    lambda: [((), frame_store.total_bytes)],
 )
 
 
+def _callback_error(callback, tag, e):
+    """Ошибка коллбека: в лог и в счётчик dash_callback_errors_total."""
+    metrics.CALLBACK_ERRORS.inc(callback)
+    logger.error(f"[{tag} ERROR] {e}")
+
+
+# Графики за период: (id, исходные данные, массивы трасс для Patch, построение полной фигуры).
+# Исходные данные: "agg" — суммы показателей (process_data), "staff" — суммы по
+# сотрудникам (измерение staff), "reasons" — топ причин
+PERIOD_CHARTS = [
+    ("calls-funnel", "agg", calls_funnel_traces, make_calls_funnel),
+    ("staff-bar", "staff", staff_bar_traces, make_staff_bar),
+    ("staff-pie", "staff", staff_pie_traces, make_staff_pie),
+    ("internet-pie", "agg", internet_pie_traces, make_internet_pie),
+    ("reasons-bar", "reasons", reasons_bar_traces, make_reasons_bar),
+]
+
+
+def _prepare_frame(df):
+    # убираем дубли колонок на всякий случай
+    if df.columns.duplicated().any():
+        df = df.loc[:, ~df.columns.duplicated()].copy()
+    return df
+
+
+# Последний кадр лоадера по листу: (sheet_id, лист) -> (weakref кадра, handle).
+# Тик refresh-interval, на котором лоадер вернул тот же объект, не хэширует лист заново
+_loaded_frames = {}
+
+
+def put_loaded_frame(sheet_id, worksheet, df):
+    """handle кадра из лоадера; отпечаток считается, только если кадр новый."""
+    key = (sheet_id, worksheet)
+    known = _loaded_frames.get(key)
+    if known is not None and known[0]() is df and frame_store.get(known[1]) is not None:
+        return known[1]
+    handle = frame_store.put(sheet_id, worksheet, _prepare_frame(df))
+    _loaded_frames[key] = (weakref.ref(df), handle)
+    return handle
+
+
+def resolve_frame(handle):
+    """
+    Достать DataFrame по handle из dcc.Store.
+    Если кадр вытеснен из реестра (или handle пришёл в другой воркер),
+    берём его из кэша лоадера и регистрируем заново — только если это та же
+    версия: после фонового обновления в кэше может лежать уже новая.
+    """
+    if not handle:
+        return None
+
+    df = frame_store.get(handle)
+    if df is not None:
+        return df
+
+    df = get_loader().load_sheet(handle["sheet_id"], handle["worksheet"])
+    if df is None:
+        return None
+    df = _prepare_frame(df)
+    if FrameStore.fingerprint(df) != handle["version"]:
+        logger.info(f"[FRAME STORE] Версия {handle['version']} листа {handle['worksheet']} уже недоступна")
+        return None
+    frame_store.put(handle["sheet_id"], handle["worksheet"], df, version=handle["version"])
+    return frame_store.get(handle)
+
+
+def _previous_derived(handle, name):
+    """(кадр, объект name) прошлой версии того же листа из реестра или None."""
+    previous = frame_store.previous(handle)
+    if previous is None or name not in previous[1]:
+        return None
+    return previous[0], previous[1][name]
+
+
+def resolve_matrix(handle):
+    """
+    Числовая матрица листа — строится один раз на загруженный кадр
+    и одна на все воркеры (read-only memmap из общего кэша).
+    Новая версия листа разбирает только колонки, изменившиеся с прошлой.
+    """
+    if resolve_frame(handle) is None:
+        return None
+
+    def build(df):
+        year = infer_year(handle["worksheet"])
+        previous = _previous_derived(handle, "matrix")
+
+        def parse():
+            return MetricMatrix.from_frame(df, year=year, previous=previous)
+
+        shared_cache = get_loader().shared_cache
+        if shared_cache is None:
+            return parse()
+        return shared_cache.matrix(
+            handle["version"], parse, sheet=f"{handle['sheet_id']}:{handle['worksheet']}",
+        )
+
+    return frame_store.derived(handle, "matrix", build)
+
+
+def resolve_rollup(handle):
+    """Итоги по дням/неделям/месяцам (Rollup); новая версия — из итогов прошлой."""
+    if resolve_frame(handle) is None:
+        return None
+
+    def build(df):
+        previous = _previous_derived(handle, "rollup")
+        return Rollup.from_previous(resolve_matrix(handle), previous[1] if previous else None)
+
+    return frame_store.derived(handle, "rollup", build)
+
+
+def resolve_processor(handle):
+    """DataProcessor листа с готовыми накопленными суммами — один на загруженный кадр."""
+    if resolve_frame(handle) is None:
+        return None
+
+    def build(df):
+        processor = DataProcessor()
+        processor.load_from_gsheet(df, handle["worksheet"], matrix=resolve_matrix(handle))
+        return processor
+
+    return frame_store.derived(handle, "processor", build)
+
+
+# Строки calls-trend: (показатель в листе, подпись на графике)
+TREND_SERIES = [
+    ("ВХОДЯЩИЕ ЗВОНКИ - ВЗ", "Входящие ВЗ"),
+    ("Принятые ВЗ", "Принятые ВЗ"),
+    ("Пропущенные ВЗ", "Пропущенные ВЗ"),
+]
+TREND_TITLES = {
+    "D": "Динамика звонков по дням",
+    "W": "Динамика звонков по неделям",
+    "M": "Динамика звонков по месяцам",
+}
+
+
+def resolve_trend_series(handle, freq="D"):
+    """
+    (подписи периодов, [(подпись, значения по периодам)]) для calls-trend —
+    один раз на загруженный кадр: приближение на графике его переиспользует.
+    По дням — колонки листа как есть, по неделям/месяцам — готовые итоги (Rollup).
+    """
+    if freq != "D":
+        rollup = resolve_rollup(handle)
+        if rollup is None:
+            return [], []
+        series = []
+        for raw_name, label in TREND_SERIES:
+            row = rollup.row(raw_name, freq)
+            if row is not None:
+                series.append((label, row))
+        return rollup.periods(freq), series
+
+    def build(df):
+        matrix = resolve_matrix(handle)
+        # Находим колонки-дни: 01.12, 02.12, 03.12, ...
+        day_pos = [
+            i for i, c in enumerate(matrix.columns)
+            if re.match(r"\d{2}\.\d{2}", str(c))
+        ]
+        series = []
+        for raw_name, label in TREND_SERIES:
+            row = matrix.row(raw_name)
+            # числа уже разобраны при загрузке
+            if row is not None and day_pos and not np.isnan(row[day_pos]).all():
+                series.append((label, row[day_pos]))
+        return [str(matrix.columns[i]) for i in day_pos], series
+
+    return frame_store.derived(handle, "trend_series", build)
+
+
+def _relayout_x_range(relayout):
+    """
+    Что сделал пользователь с осью X calls-trend: (первый день, последний день)
+    при приближении, "full" при сбросе или первой отрисовке, None — ось X не менялась.
+    """
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return float(relayout["xaxis.range[0]"]), float(relayout["xaxis.range[1]"])
+    if "xaxis.range" in relayout:
+        first, last = relayout["xaxis.range"]
+        return float(first), float(last)
+    if relayout.get("xaxis.autorange") or relayout.get("autosize"):
+        return "full"
+    return None
+
+
+def _slider_props(handle, value=None, old_max=None):
+    """
+    (max, value) слайдера под лист. Выбранный период сохраняется и обрезается
+    по новым границам (фоновое обновление не сбрасывает его на весь месяц);
+    если он доходил до конца листа — тянется до нового конца.
+    """
+    processor = resolve_processor(handle)
+    max_day = max(processor.max_day, 1) if processor is not None else 1
+    if not value:
+        return max_day, [1, max_day]
+    start, end = value
+    if old_max is not None and end >= old_max:
+        end = max_day
+    end = min(end, max_day)
+    return max_day, [min(max(start, 1), end), end]
+
+
 def register_callbacks(app):
     """
     Коллбеки:
     1) загрузка списка листов в два дропдауна
-    2) загрузка выбранного листа в main-df
-    3) построение графика calls-trend по строкам ВЗ
+    2) загрузка выбранного и сравниваемого листов в main-df / compare-df
+       (и подхват копий, обновлённых в фоне, по таймеру refresh-interval)
+    3) построение графика calls-trend по строкам ВЗ по дням, неделям или
+       месяцам (trend-granularity); при приближении видимый диапазон
+       перезапрашивается (прореживание под ширину графика)
+    4) границы слайдеров day-range / compare-range под загруженные листы
+    5) графики за выбранный период (day-range), включая топ причин
+    6) таблица сравнения периодов: day-range основного листа против
+       compare-range сравниваемого (или того же) листа
     """
 
     # 1. Загружаем список листов
@@ -41,111 +376,339 @@ def register_callbacks(app):
             raise PreventUpdate
 
         try:
-            sheet_names = loader.list_sheets(sheet_id)
+            sheet_names = get_source(sheet_id).list_sheets()
             options = [{"label": name, "value": name} for name in sheet_names]
+            # Пока пользователь выбирает лист, подтягиваем все «Отчет…» в кэш
+            get_loader().prefetch_reports(sheet_id)
             return options, options
         except Exception as e:
-            print(f"[GSHEET ERROR] {e}")
+            _callback_error("load_gsheet_worksheets", "GSHEET", e)
             return [], []
 
-    # 2. Загружаем выбранный лист и кладём его в main-df
+    # 2. Загружаем выбранный и сравниваемый листы одним запросом,
+    #    кладём их handle в main-df / compare-df
     @app.callback(
-        Output("main-df", "data"),
-        Input("gsheet-name", "value"),
-        State("gsheet-id", "value"),
+        [
+            Output("main-df", "data"),
+            Output("compare-df", "data"),
+        ],
+        [
+            Input("gsheet-name", "value"),
+            Input("compare-gsheet-name", "value"),
+            Input("refresh-interval", "n_intervals"),
+        ],
+        [
+            State("gsheet-id", "value"),
+            State("main-df", "data"),
+            State("compare-df", "data"),
+        ],
         prevent_initial_call=True,
     )
-    def load_selected_sheet(worksheet_name, sheet_id):
+    def load_selected_sheets(worksheet_name, compare_name, _n_intervals, sheet_id,
+                             current_handle, current_compare):
         if not worksheet_name or not sheet_id:
             raise PreventUpdate
 
         try:
-            df = loader.load_sheet(sheet_id, worksheet_name)
-            if df is None:
-                return []
+            frames = get_source(sheet_id).load_many([worksheet_name, compare_name])
 
-            # убираем дубли колонок на всякий случай
-            if df.columns.duplicated().any():
-                df = df.loc[:, ~df.columns.duplicated()].copy()
+            handles = []
+            for name in (worksheet_name, compare_name):
+                df = frames.get(name) if name else None
+                handles.append(put_loaded_frame(sheet_id, name, df) if df is not None else None)
 
-            return df.to_dict("records")
+            # Тик таймера без изменений в фоне — графики не трогаем
+            if ctx.triggered_id == "refresh-interval" and handles == [current_handle, current_compare]:
+                raise PreventUpdate
+            return handles[0], handles[1]
+        except PreventUpdate:
+            raise
         except Exception as e:
-            print(f"[GSHEET LOAD ERROR] {e}")
-            return []
+            _callback_error("load_selected_sheets", "GSHEET LOAD", e)
+            return None, None
 
-    # 3. Строим график по "ВХОДЯЩИЕ ЗВОНКИ - ВЗ", "Принятые ВЗ", "Пропущенные ВЗ"
+    # 3. Строим график по "ВХОДЯЩИЕ ЗВОНКИ - ВЗ", "Принятые ВЗ", "Пропущенные ВЗ".
+    #    Длинные ряды прореживаются под ширину графика (из trend-view)
     @app.callback(
-        Output("calls-trend", "figure"),
-        Input("main-df", "data"),
+        [
+            Output("calls-trend", "figure"),
+            Output("trend-figure-state", "data"),
+        ],
+        [
+            Input("main-df", "data"),
+            Input("trend-granularity", "value"),
+        ],
+        [
+            State("trend-figure-state", "data"),
+            State("trend-view", "data"),
+        ],
         prevent_initial_call=True,
     )
-    def update_calls_trend(data):
+    def update_calls_trend(handle, freq, figure_state, trend_view):
         # Базовая фигура, чтобы всегда что-то вернуть
         fig = go.Figure()
 
-        if not data:
+        if not handle:
             fig.update_layout(title="Нет данных для отображения")
             raise PreventUpdate
 
         try:
-            df = pd.DataFrame(data)
+            df = resolve_frame(handle)
+            if df is None or df.empty:
+                fig.update_layout(title="Нет данных для отображения")
+                return fig, {}
 
             # Проверяем, что нужные колонки есть
             if "Показатель" not in df.columns:
                 fig.update_layout(title="Колонка 'Показатель' не найдена")
-                return fig
+                return fig, {}
 
-            # Находим колонки-дни: 01.12, 02.12, 03.12, ...
-            day_cols = [
-                c for c in df.columns
-                if re.match(r"\d{2}\.\d{2}", str(c))
-            ]
+            freq = freq or "D"
+            day_cols, series = resolve_trend_series(handle, freq)
             if not day_cols:
                 fig.update_layout(title="Не найдено колонок с датами (формат 01.12, 02.12, ...)")
-                return fig
-
-            # Функция, которая достаёт ряд по названию показателя
-            def get_series(metric_name: str):
-                row = df[df["Показатель"] == metric_name]
-                if row.empty:
-                    return None
-                s = row.iloc[0][day_cols]
-                # приводим к числам
-                return pd.to_numeric(s, errors="coerce")
-
-            series_config = [
-                ("ВХОДЯЩИЕ ЗВОНКИ - ВЗ", "Входящие ВЗ"),
-                ("Принятые ВЗ", "Принятые ВЗ"),
-                ("Пропущенные ВЗ", "Пропущенные ВЗ"),
-            ]
-
-            for raw_name, label in series_config:
-                y = get_series(raw_name)
-                if y is not None and not y.isna().all():
-                    fig.add_trace(
-                        go.Scatter(
-                            x=day_cols,
-                            y=y,
-                            mode="lines+markers",
-                            name=label,
-                        )
-                    )
-
-            if not fig.data:
-                fig.update_layout(title="Не удалось найти строки с ВЗ для графика")
-            else:
-                fig.update_layout(
-                    title="Динамика звонков по дням",
-                    xaxis_title="Дата",
-                    yaxis_title="Количество",
-                    margin=dict(l=40, r=20, t=60, b=120),
-                    xaxis_tickangle=-45,
-                )
+                return fig, {}
 
-            return fig
+            width = (trend_view or {}).get("width")
+            title = TREND_TITLES[freq]
+            # Без версии: после фонового обновления приближение на графике сохраняется
+            uirevision = f"{handle['sheet_id']}:{handle['worksheet']}:{freq}"
+            # Трассы нужны и для Patch, и для полной фигуры — считаем один раз
+            computed = []
+
+            def traces():
+                if not computed:
+                    computed.append(calls_trend_traces(series, day_cols, width_px=width))
+                return computed[0]
+
+            figure, signature = figure_cache.render(
+                (handle["version"], ("width", trend_points(width), freq), "calls-trend"),
+                "calls-trend",
+                traces,
+                lambda: make_calls_trend(
+                    traces(),
+                    trend_ticks(day_cols, width_px=width),
+                    uirevision=uirevision,
+                    title=title,
+                ),
+                (figure_state or {}).get("calls-trend"),
+            )
+            if isinstance(figure, Patch):
+                # число периодов или гранулярность могли измениться — подписи и заголовок тоже
+                for key, value in trend_ticks(day_cols, width_px=width).items():
+                    figure["layout"]["xaxis"][key] = value
+                figure["layout"]["title"]["text"] = title
+                figure["layout"]["uirevision"] = uirevision
+            return figure, {"calls-trend": signature}
 
         except Exception as e:
             # Логируем, но не роняем приложение
-            print(f"[CALLS_TREND ERROR] {e}")
+            _callback_error("update_calls_trend", "CALLS_TREND", e)
             fig.update_layout(title=f"Ошибка построения графика: {e}")
-            return fig
+            return fig, {}
+
+    # 3а. Ширина calls-trend и последнее приближение/сброс — из браузера
+    app.clientside_callback(
+        """
+        function(relayoutData) {
+            const graph = document.getElementById("calls-trend");
+            return {width: graph ? graph.offsetWidth : null, relayout: relayoutData || {}};
+        }
+        """,
+        Output("trend-view", "data"),
+        Input("calls-trend", "relayoutData"),
+        prevent_initial_call=True,
+    )
+
+    # 3б. Приближение на calls-trend: видимые дни запрашиваются заново, уходит Patch.
+    #     Весь лист — прореженный, узкое окно — точные значения
+    @app.callback(
+        Output("calls-trend", "figure", allow_duplicate=True),
+        Input("trend-view", "data"),
+        [
+            State("main-df", "data"),
+            State("trend-granularity", "value"),
+            State("trend-figure-state", "data"),
+        ],
+        prevent_initial_call=True,
+    )
+    def requery_calls_trend(trend_view, handle, freq, figure_state):
+        if not handle or not trend_view:
+            raise PreventUpdate
+
+        view = _relayout_x_range(trend_view.get("relayout") or {})
+        if view is None:
+            raise PreventUpdate  # изменилось не по оси X
+
+        try:
+            if resolve_frame(handle) is None:
+                raise PreventUpdate
+            day_cols, series = resolve_trend_series(handle, freq or "D")
+            if not series:
+                raise PreventUpdate
+
+            x_range = None if view == "full" else view
+            width = trend_view.get("width")
+            traces = calls_trend_traces(series, day_cols, x_range, width)
+            # Patch пишет в трассы по номеру: у клиента должны быть те же ряды
+            # в том же порядке, иначе ждём полную фигуру от update_calls_trend
+            if figure_signature("calls-trend", traces) != (figure_state or {}).get("calls-trend"):
+                raise PreventUpdate
+            patch = trace_patch(traces)
+            for key, value in trend_ticks(day_cols, x_range, width).items():
+                patch["layout"]["xaxis"][key] = value
+            return patch
+        except PreventUpdate:
+            raise
+        except Exception as e:
+            _callback_error("requery_calls_trend", "CALLS_TREND", e)
+            raise PreventUpdate
+
+    # 4. Подстраиваем слайдеры под число дней в загруженных листах
+    @app.callback(
+        [
+            Output("day-range", "max"),
+            Output("day-range", "value"),
+        ],
+        Input("main-df", "data"),
+        [
+            State("day-range", "value"),
+            State("day-range", "max"),
+        ],
+        prevent_initial_call=True,
+    )
+    def update_day_range(handle, value, old_max):
+        if not handle:
+            raise PreventUpdate
+        return _slider_props(handle, value, old_max)
+
+    # Без сравниваемого листа период B берётся из основного — и границы тоже
+    @app.callback(
+        [
+            Output("compare-range", "max"),
+            Output("compare-range", "value"),
+        ],
+        [
+            Input("main-df", "data"),
+            Input("compare-df", "data"),
+        ],
+        [
+            State("compare-range", "value"),
+            State("compare-range", "max"),
+        ],
+        prevent_initial_call=True,
+    )
+    def update_compare_range(handle, compare_handle, value, old_max):
+        handle = compare_handle or handle
+        if not handle:
+            raise PreventUpdate
+        return _slider_props(handle, value, old_max)
+
+    # 5. Графики за период: суммы берутся из накопленных сумм,
+    #    поэтому перетаскивание слайдера не пересчитывает весь лист.
+    #    Если структура графика у клиента та же — уходит только Patch с массивами
+    @app.callback(
+        [
+            Output("calls-funnel", "figure"),
+            Output("staff-bar", "figure"),
+            Output("staff-pie", "figure"),
+            Output("internet-pie", "figure"),
+            Output("reasons-bar", "figure"),
+            Output("day-range-output", "children"),
+            Output("period-figure-state", "data"),
+        ],
+        [
+            Input("main-df", "data"),
+            Input("day-range", "value"),
+        ],
+        State("period-figure-state", "data"),
+        prevent_initial_call=True,
+    )
+    def update_period_charts(handle, day_range, figure_state):
+        if not handle or not day_range:
+            raise PreventUpdate
+
+        figure_state = figure_state or {}
+        try:
+            processor = resolve_processor(handle)
+            if processor is None:
+                raise PreventUpdate
+
+            # Суммы нужны только при промахе кэша фигур
+            computed = {}
+            sources = {
+                "agg": lambda: processor.process_data(day_range, include_raw=False)[1],
+                "staff": lambda: processor.dimension_totals("staff", day_range, top_k=Config.STAFF_TOP_K),
+                "reasons": lambda: processor.top_reasons(day_range),
+            }
+
+            def data(source):
+                if source not in computed:
+                    computed[source] = sources[source]()
+                return computed[source]
+
+            outputs, new_state = [], {}
+            for chart_id, source, traces_fn, build_fn in PERIOD_CHARTS:
+                figure, signature = figure_cache.render(
+                    (handle["version"], tuple(day_range), chart_id),
+                    chart_id,
+                    lambda fn=traces_fn, src=source: fn(data(src)),
+                    lambda fn=build_fn, src=source: fn(data(src)),
+                    figure_state.get(chart_id),
+                )
+                outputs.append(figure)
+                new_state[chart_id] = signature
+
+            start_day, end_day = day_range
+            return (
+                *outputs,
+                f"Период: дни {start_day}–{end_day} из {processor.max_day}",
+                new_state,
+            )
+        except PreventUpdate:
+            raise
+        except Exception as e:
+            _callback_error("update_period_charts", "PERIOD CHARTS", e)
+            empty = go.Figure()
+            return empty, empty, empty, empty, empty, f"Ошибка: {e}", {}
+
+    # 6. Сравнение периодов. Без compare-gsheet-name сравниваем
+    #    два диапазона одного листа
+    @app.callback(
+        Output("compare-table", "children"),
+        [
+            Input("main-df", "data"),
+            Input("day-range", "value"),
+            Input("compare-df", "data"),
+            Input("compare-range", "value"),
+        ],
+        prevent_initial_call=True,
+    )
+    def update_comparison(handle, day_range, compare_handle, compare_range):
+        if not handle or not day_range or not compare_range:
+            raise PreventUpdate
+
+        compare_handle = compare_handle or handle
+        try:
+            processor_a = resolve_processor(handle)
+            processor_b = resolve_processor(compare_handle)
+            if processor_a is None or processor_b is None:
+                raise PreventUpdate
+
+            result = comparison.compare(
+                processor_a, day_range, processor_b, compare_range,
+                version_a=(handle["worksheet"], handle["version"]),
+                version_b=(compare_handle["worksheet"], compare_handle["version"]),
+            )
+            if result.empty:
+                return html.Div("Нет данных для сравнения")
+
+            table = result.round({"Период A": 2, "Период B": 2, "Разница": 2, "Разница, %": 1})
+            return dbc.Table.from_dataframe(
+                table.fillna("—"), striped=True, bordered=True, hover=True, size="sm"
+            )
+        except PreventUpdate:
+            raise
+        except Exception as e:
+            _callback_error("update_comparison", "COMPARISON", e)
+            return html.Div(f"Ошибка сравнения: {e}")
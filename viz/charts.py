@@ -1,51 +1,189 @@
 # viz/charts.py
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from config import Config
+from core.downsample import downsample
+from core.metric_index import frame_index
 
 def _safe_value(df_agg: pd.DataFrame, name: str) -> float:
     if df_agg.empty or "Показатель" not in df_agg.columns:
         return 0
-    m = df_agg[df_agg["Показатель"].str.contains(name, na=False, case=False)]
-    if m.empty:
+    row = frame_index(df_agg).lookup(name)
+    if row is None:
         return 0
-    return float(pd.to_numeric(m["Сумма за период"].iloc[0], errors="coerce") or 0)
+    # "Сумма за период" уже числовая — её считает DataProcessor по матрице
+    return float(df_agg["Сумма за период"].iat[row] or 0)
 
-def make_staff_charts(df_agg: pd.DataFrame):
-    bar_df = pd.DataFrame({
-        "Сотрудник": Config.STAFF_NAMES,
-        "Переадресовано успешно ВЗ": [_safe_value(df_agg, name) for name in Config.STAFF_NAMES]
-    })
-    bar_df = bar_df[bar_df["Переадресовано успешно ВЗ"] > 0]
+def _staff_frame(staff_totals: pd.DataFrame) -> pd.DataFrame:
+    # staff_totals — DataProcessor.dimension_totals("staff", ...): уже по убыванию, с «Прочие»
+    bar_df = staff_totals.rename(columns={"Сущность": "Сотрудник", "Значение": "Переадресовано успешно ВЗ"})
+    return bar_df[bar_df["Переадресовано успешно ВЗ"] > 0]
 
+def _internet_frame(df_agg: pd.DataFrame) -> pd.DataFrame:
+    labels = ["Дозвонились ИЗ", "Не обработаны ИЗ", "Не дозвонились ИЗ"]
+    values = [_safe_value(df_agg, l) for l in labels]
+    df = pd.DataFrame({"Статус": labels, "Количество": values})
+    return df[df["Количество"] > 0]
+
+def _funnel_values(df_agg: pd.DataFrame):
+    labels = ["Всего входящих", "Принятые ВЗ", "Переадресованные успешно ВЗ", "Непринятые ВЗ"]
+    vals = [
+        _safe_value(df_agg, "Входящие звонки - ВЗ"),
+        _safe_value(df_agg, "Принятые ВЗ"),
+        _safe_value(df_agg, "Переадресованные успешно ВЗ"),
+        _safe_value(df_agg, "Непринятые ВЗ"),
+    ]
+    return labels, vals
+
+# Массивы трасс для частичного обновления (Patch): тот же порядок и число трасс,
+# что и у фигур make_*, но без построения самих фигур
+
+def staff_bar_traces(staff_totals: pd.DataFrame):
+    bar_df = _staff_frame(staff_totals)
+    return [{"x": bar_df["Сотрудник"].tolist(), "y": bar_df["Переадресовано успешно ВЗ"].tolist()}]
+
+def staff_pie_traces(staff_totals: pd.DataFrame):
+    bar_df = _staff_frame(staff_totals)
+    return [{"labels": bar_df["Сотрудник"].tolist(), "values": bar_df["Переадресовано успешно ВЗ"].tolist()}]
+
+def internet_pie_traces(df_agg: pd.DataFrame):
+    df = _internet_frame(df_agg)
+    if df.empty:
+        return []
+    return [{"labels": df["Статус"].tolist(), "values": df["Количество"].tolist()}]
+
+def calls_funnel_traces(df_agg: pd.DataFrame):
+    labels, vals = _funnel_values(df_agg)
+    return [{"y": labels, "x": vals}]
+
+def make_staff_bar(staff_totals: pd.DataFrame):
+    import plotly.express as px  # тяжёлый импорт — при первом построении
+
+    bar_df = _staff_frame(staff_totals)
     fig_bar = px.bar(bar_df, x="Сотрудник", y="Переадресовано успешно ВЗ",
                      title="Переадресовано успешно ВЗ по сотрудникам", text_auto=True,
                      color_discrete_sequence=[Config.COLORS['primary']])
     fig_bar.update_layout(showlegend=False)
+    return fig_bar
+
+def make_staff_pie(staff_totals: pd.DataFrame):
+    import plotly.express as px
 
+    bar_df = _staff_frame(staff_totals)
     fig_pie = px.pie(bar_df, names="Сотрудник", values="Переадресовано успешно ВЗ",
                      title="Распределение переадресаций")
     fig_pie.update_traces(textinfo="percent+value")
-    return fig_bar, fig_pie
+    return fig_pie
+
+def make_staff_charts(staff_totals: pd.DataFrame):
+    return make_staff_bar(staff_totals), make_staff_pie(staff_totals)
 
 def make_internet_pie(df_agg: pd.DataFrame):
-    labels = ["Дозвонились ИЗ", "Не обработаны ИЗ", "Не дозвонились ИЗ"]
-    values = [_safe_value(df_agg, l) for l in labels]
-    df = pd.DataFrame({"Статус": labels, "Количество": values})
-    df = df[df["Количество"] > 0]
+    import plotly.express as px
+
+    df = _internet_frame(df_agg)
     if df.empty:
         return go.Figure()
     fig = px.pie(df, names="Статус", values="Количество", title="Распределение интернет-заявок (ИЗ)")
     fig.update_traces(textinfo="percent+value")
     return fig
 
+def reasons_bar_traces(top_reasons: pd.DataFrame):
+    if top_reasons.empty:
+        return []
+    counts = top_reasons["Количество"].tolist()
+    # text — подписи на столбцах (как в make_reasons_bar), иначе Patch оставит старые числа
+    return [{"y": top_reasons["Причина"].tolist(), "x": counts, "text": counts}]
+
+def make_reasons_bar(top_reasons: pd.DataFrame):
+    if top_reasons.empty:
+        fig = go.Figure()
+        fig.update_layout(title="Нет данных по причинам за период")
+        return fig
+    fig = go.Figure(go.Bar(
+        y=top_reasons["Причина"], x=top_reasons["Количество"], orientation="h",
+        marker_color=Config.COLORS["primary"], text=top_reasons["Количество"], textposition="auto",
+    ))
+    # Самая частая причина — сверху
+    fig.update_layout(title=f"Топ-{Config.MAX_REASONS_DISPLAY} причин", yaxis_autorange="reversed",
+                      margin=dict(l=220, r=20, t=60, b=40))
+    return fig
+
 def make_calls_funnel(df_agg: pd.DataFrame):
-    labels = ["Всего входящих", "Принятые ВЗ", "Переадресованные успешно ВЗ", "Непринятые ВЗ"]
-    vals = [
-        _safe_value(df_agg, "Входящие звонки - ВЗ"),
-        _safe_value(df_agg, "Принятые ВЗ"),
-        _safe_value(df_agg, "Переадресованные успешно ВЗ"),
-        _safe_value(df_agg, "Непринятые ВЗ"),
-    ]
+    labels, vals = _funnel_values(df_agg)
     return go.Figure(go.Funnel(y=labels, x=vals, textinfo="value+percent previous"))
+
+# Динамика по дням (calls-trend): x — номер дня с 1, подпись "dd.mm" — в text и на оси.
+# x_range — видимые дни (первый, последний) после приближения, None — весь лист
+
+def trend_points(width_px=None) -> int:
+    """Сколько точек на трассу помещается в ширину графика."""
+    width_px = width_px or Config.TREND_DEFAULT_WIDTH_PX
+    return max(int(width_px * Config.TREND_POINTS_PER_PX), 3)
+
+def _trend_window(n_days, x_range):
+    first, last = (1, n_days) if x_range is None else x_range
+    # по точке за краями, чтобы линии доходили до границ графика
+    return max(int(np.floor(first)) - 2, 0), min(int(np.ceil(last)) + 1, n_days)
+
+def calls_trend_traces(series, day_labels, x_range=None, width_px=None):
+    """
+    series — [(название, значения по дням)]. Точки, не помещающиеся в ширину графика,
+    прореживаются (core/downsample.py); в приближенном окне точек меньше,
+    и значения снова точные. Много точек — WebGL-трассы.
+    """
+    lo, hi = _trend_window(len(day_labels), x_range)
+    labels = np.asarray(day_labels, dtype=object)
+    n_points = trend_points(width_px)
+
+    traces = []
+    for name, values in series:
+        values = np.asarray(values, dtype=np.float64)
+        picked = downsample(values[lo:hi], n_points, Config.TREND_DOWNSAMPLE) + lo
+        traces.append({
+            "x": (picked + 1).tolist(),
+            "y": [None if np.isnan(v) else v for v in values[picked].tolist()],
+            "text": labels[picked].tolist(),
+            "name": name,
+        })
+
+    total = sum(len(t["x"]) for t in traces)
+    trace_type = "scattergl" if total > Config.TREND_WEBGL_THRESHOLD else "scatter"
+    for trace in traces:
+        trace["type"] = trace_type
+    return traces
+
+def trend_ticks(day_labels, x_range=None, width_px=None):
+    """Подписи оси X для видимых дней — не чаще, чем раз в 40 px."""
+    n_days = len(day_labels)
+    first, last = (1, n_days) if x_range is None else x_range
+    first, last = max(int(np.ceil(first)), 1), min(int(np.floor(last)), n_days)
+    max_ticks = max((width_px or Config.TREND_DEFAULT_WIDTH_PX) // 40, 2)
+    step = max(-(-(last - first + 1) // max_ticks), 1)
+    tickvals = list(range(first, last + 1, step))
+    return {"tickmode": "array", "tickvals": tickvals, "ticktext": [day_labels[v - 1] for v in tickvals]}
+
+def make_calls_trend(traces, xaxis_ticks, uirevision=None, title="Динамика звонков по дням"):
+    fig = go.Figure()
+    for trace in traces:
+        scatter = go.Scattergl if trace["type"] == "scattergl" else go.Scatter
+        fig.add_trace(scatter(
+            x=trace["x"], y=trace["y"], text=trace["text"], name=trace["name"],
+            mode="lines+markers", hovertemplate="%{text}: %{y}",
+        ))
+
+    if not fig.data:
+        fig.update_layout(title="Не удалось найти строки с ВЗ для графика")
+        return fig
+    # uirevision: приближение пользователя переживает Patch с новыми точками
+    fig.update_layout(
+        title=title,
+        xaxis_title="Дата",
+        yaxis_title="Количество",
+        margin=dict(l=40, r=20, t=60, b=120),
+        xaxis_tickangle=-45,
+        uirevision=uirevision,
+    )
+    fig.update_xaxes(**xaxis_ticks)
+    return fig
@@ -0,0 +1,54 @@
+# viz/figure_cache.py
+from dash import Patch
+
+from core.cache import TTLCache
+
+
+def figure_signature(chart_id, traces):
+    """Структура фигуры: график, число трасс и их имена. Совпала — хватит Patch."""
+    names = ",".join(str(t.get("name", "")) for t in traces)
+    return f"{chart_id}|{len(traces)}|{names}"
+
+
+def trace_patch(traces):
+    """Patch, заменяющий только массивы данных трасс (x/y, labels/values)."""
+    patch = Patch()
+    for i, trace in enumerate(traces):
+        for key, values in trace.items():
+            if key != "name":
+                patch["data"][i][key] = values
+    return patch
+
+
+class FigureCache:
+    """
+    LRU-кэш фигур по (версия данных, диапазон дней, id графика).
+
+    render() отдаёт полную фигуру, только если у клиента другая структура графика
+    (client_signature из dcc.Store); иначе — Patch с новыми массивами трасс,
+    и дорогое построение px-фигуры вообще не выполняется.
+    """
+
+    def __init__(self, maxsize=256):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    def render(self, key, chart_id, traces_fn, build_fn, client_signature=None):
+        """Вернуть (figure или Patch, signature)."""
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = {"traces": traces_fn(), "figure": None}
+            self._cache.set(key, entry)
+
+        signature = figure_signature(chart_id, entry["traces"])
+        if client_signature == signature:
+            return trace_patch(entry["traces"]), signature
+
+        if entry["figure"] is None:
+            entry["figure"] = build_fn()
+        return entry["figure"], signature
+
+    def stats(self):
+        return self._cache.stats()
+
+    def clear(self):
+        self._cache.clear()
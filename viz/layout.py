@@ -2,11 +2,20 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 
+from config import Config
+
 
 def build_layout():
     return dbc.Container([
         dcc.Store(id="main-df"),
         dcc.Store(id="compare-df"),
+        # Структура графиков на клиенте: совпадает — коллбеки шлют Patch вместо фигуры
+        dcc.Store(id="period-figure-state"),
+        dcc.Store(id="trend-figure-state"),
+        # Ширина calls-trend и последнее приближение (relayoutData) — для перезапроса точек
+        dcc.Store(id="trend-view"),
+        # Периодически подхватываем копию листа, обновлённую в фоне
+        dcc.Interval(id="refresh-interval", interval=Config.UI_REFRESH_INTERVAL_MS),
 
         dbc.Row([
             dbc.Col(
@@ -28,6 +37,7 @@ def build_layout():
         dcc.RangeSlider(id="day-range", min=1, max=5, value=[1, 5]),
         dcc.RangeSlider(id="compare-range", min=1, max=5, value=[1, 5]),
         html.Div(id="day-range-output"),
+        html.Div(id="compare-table", className="mt-3"),
 
         # ✅ ДОБАВЛЕН ОТСУТСТВУЮЩИЙ КОМПОНЕНТ
         html.Div(id="debug-main-df", className="mt-3 p-3 bg-light", style={
@@ -39,9 +49,21 @@ def build_layout():
         }),
 
         html.Div(id="metrics-cards", className="mt-3"),
+        dcc.RadioItems(
+            id="trend-granularity",
+            options=[
+                {"label": "По дням", "value": "D"},
+                {"label": "По неделям", "value": "W"},
+                {"label": "По месяцам", "value": "M"},
+            ],
+            value="D",
+            inline=True,
+            className="mt-3",
+        ),
         dcc.Graph(id="calls-trend"),
         dcc.Graph(id="calls-funnel"),
         dcc.Graph(id="staff-bar"),
         dcc.Graph(id="staff-pie"),
         dcc.Graph(id="internet-pie"),
+        dcc.Graph(id="reasons-bar"),
     ], fluid=True)
\ No newline at end of file